@@ -1,242 +1,203 @@
 import os
 os.environ.setdefault('TRANSFORMERS_VERBOSITY', 'error')  # Suppress transformers advisory noise
 
-import streamlit as st
-import json
-import chromadb
-from chromadb.utils import embedding_functions
-from sentence_transformers import SentenceTransformer
-from gtts import gTTS
-import tempfile
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
 import time
-from pathlib import Path
+_import_start = time.perf_counter()
+
+import streamlit as st
+
+# Heavy modules (chromadb, sentence_transformers/torch, gtts) are imported lazily:
+# the model and index load on a background thread (see startup.py) so the UI renders first.
+import startup
+
+import audio_pack
+import audio_pipeline
+from audio_assets import AssetIndex
+from audio_store import AudioStore
+import query_engine
+import reranker
+import tts_backends
+import verse_store
+from instrumentation import metrics, start_exporter
+from config import (
+    RELEVANCE_THRESHOLD, TOP_K, SAMPLE_QUESTIONS,
+    RETRIEVAL_BACKEND, AUDIO_CACHE_MAX_BYTES, EMBEDDING_SERVER_SOCKET, RERANK,
+)
+
+startup.profile.record("import_app_modules", time.perf_counter() - _import_start)
 
 # --- Configuration ---
 st.set_page_config(page_title="Bhagavad Gita Knowledge Repository", layout="wide")
 
-# --- Constants ---
-JSON_FILE_PATH = "bhagavadgita_Chapter_2.json"
-EMBEDDING_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
-COLLECTION_NAME = "gita_chapter_2_v4" # Bumped to v4 for multilingual re-indexing
-RELEVANCE_THRESHOLD = 0.3
-AUDIO_DIR = "audio_files"
-
 # --- Audio Auto-Generation ---
 
 @st.cache_resource
-def ensure_audio_files():
+def get_asset_index(corpus_version):
     """
-    Checks if pre-generated audio files exist. If not, generates them
-    automatically so the user never needs to run separate scripts.
-    Runs once per server session via st.cache_resource.
+    Expected-vs-present audio clips per (verse, language). Loaded from the cached
+    manifest in O(1) when nothing changed; rescanned only when the fingerprint differs.
     """
-    audio_path = Path(AUDIO_DIR)
-    lang_dirs = {"en": "en", "kn": "kn", "sa": "sa"}
-
-    # Check if any MP3 exists across all language subdirs
-    has_audio = any(
-        list((audio_path / lang).glob("*.mp3"))
-        for lang in lang_dirs
-        if (audio_path / lang).exists()
-    )
-
-    if has_audio:
-        return  # All good, nothing to do
+    return AssetIndex.load_or_build(corpus_version, lambda: iter(verse_store.get_store()))
 
-    # --- First-time generation ---
-    try:
-        with open(JSON_FILE_PATH, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        st.error(f"Cannot generate audio: {JSON_FILE_PATH} not found.")
-        return
-
-    verses = data['chapters'][0]['verses']
-    total = len(verses)
-
-    # Create directories
-    for lang in lang_dirs:
-        (audio_path / lang).mkdir(parents=True, exist_ok=True)
-
-    st.info("🎵 First-time setup: Generating audio files for all verses. This will take a few minutes...")
-    progress_bar = st.progress(0, text="Generating audio files...")
-
-    success, errors = 0, 0
-    total_files = total * 3  # en + kn + sa
-    done = 0
-
-    for idx, verse in enumerate(verses):
-        verse_num = verse['verse']
-
-        tasks = [
-            (verse['english_translation'], audio_path / "en" / f"verse_{verse_num}.mp3", 'en'),
-            (verse['translation'],         audio_path / "kn" / f"verse_{verse_num}.mp3", 'kn'),
-            (verse['text'],                audio_path / "sa" / f"verse_{verse_num}.mp3", 'hi'),  # Hindi proxy for Sanskrit
-        ]
-
-        for text, out_path, lang_code in tasks:
-            if not out_path.exists():
-                try:
-                    gTTS(text=text, lang=lang_code).save(str(out_path))
-                    success += 1
-                    time.sleep(0.5)  # Avoid rate-limiting
-                except Exception as e:
-                    errors += 1
-                    print(f"Audio gen error for {out_path.name}: {e}")
-            done += 1
-            progress_bar.progress(
-                done / total_files,
-                text=f"Generating audio… Verse {idx + 1}/{total} ({done}/{total_files} files)"
-            )
+@st.cache_resource
+def ensure_audio_files(corpus_version):
+    """
+    Starts background generation of the clips the asset index reports missing,
+    so the user never needs to run separate scripts and page render never blocks.
+    Runs once per server session via st.cache_resource; returns the pipeline
+    so its progress can be shown.
+    """
+    index = get_asset_index(corpus_version)
+    missing = index.missing()
+    if not missing:
+        return None  # All good, nothing to do
+
+    jobs = [job for job in audio_pipeline.build_jobs(verse_store.get_store()) if job.key in missing]
+
+    def on_progress(status, job, outcome):
+        if outcome == 'succeeded':
+            index.mark_present(job.key, job.out_path)
+        if status.done == status.total:
+            index.refresh_fingerprint(corpus_version)
+            index.save()
+
+    pipeline = audio_pipeline.AudioPipeline()
+    pipeline.start(jobs, on_progress=on_progress)
+    return pipeline
+
+@st.fragment(run_every=2)
+def render_audio_generation_progress(pipeline):
+    """Polls the background audio pipeline without rerunning the rest of the page."""
+    if not pipeline.is_running:
+        st.rerun()  # The full rerun renders the outcome and stops polling
+    status = pipeline.status
+    st.progress(
+        status.fraction,
+        text=f"🎵 Generating audio files in the background… {status.done}/{status.total} "
+             f"({status.failed} error(s)). You can keep searching meanwhile.",
+    )
 
-    progress_bar.empty()
-    if errors == 0:
-        st.success(f"✅ Audio generation complete! {success} files created.")
-    else:
-        st.warning(f"Audio generation done with {errors} error(s). {success} files created.")
-    time.sleep(2)
-    st.rerun()
+def render_audio_generation_outcome(pipeline):
+    """Final status of a finished audio pipeline run, if anything went wrong."""
+    status = pipeline.status
+    if status.failed:
+        st.caption(f"Audio generation finished with {status.failed} error(s); "
+                   f"{status.succeeded} files created. Missing clips will be retried on next start.")
+    if status.abandoned:
+        st.caption(f"{len(status.abandoned)} audio clip(s) are no longer retried after repeated failures.")
 
 # --- Helper Functions ---
 
 @st.cache_resource
-def load_data():
-    """Loads the Bhagavad Gita JSON data."""
-    try:
-        with open(JSON_FILE_PATH, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
-    except FileNotFoundError:
-        st.error(f"File not found: {JSON_FILE_PATH}")
-        return None
-
-@st.cache_resource
-def initialize_vector_store():
-    """Initializes ChromaDB and loads data if not present."""
-    data = load_data()
-    if not data:
-        return None, None
-
-    # Use PersistentClient to save data to disk
-    db_path = os.path.join(os.getcwd(), "chroma_db")
-    client = chromadb.PersistentClient(path=db_path)
-    
-    # Use SentenceTransformer for embeddings
-    sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL_NAME)
-    
-    try:
-        collection = client.get_or_create_collection(name=COLLECTION_NAME, embedding_function=sentence_transformer_ef)
-        
-        # Check if we need to populate
-        if collection.count() == 0:
-            documents = []
-            metadatas = []
-            ids = []
-            
-            chapter = data['chapters'][0]
-            for verse in chapter['verses']:
-                # Chunking Strategy:
-                # Since each verse is a distinct, self-contained semantic unit, we treat each verse as a single chunk.
-                # We combine English, Kannada, and Sanskrit text to ensure the embedding captures the full context 
-                # and allows for multilingual retrieval (though the model is English-focused).
-                doc_text = f"{verse['english_translation']} {verse['translation']} {verse['text']}"
-                
-                documents.append(doc_text)
-                metadatas.append({
-                    "verse": verse['verse'],
-                    "text": verse['text'], # Sanskrit in Kannada script
-                    "translation": verse['translation'],
-                    "english_translation": verse['english_translation']
-                })
-                ids.append(f"verse_{verse['verse']}")
-            
-            # Add to collection (Chroma handles tokenization and embedding internally via the EF)
-            collection.add(documents=documents, metadatas=metadatas, ids=ids)
-            print(f"Added {len(documents)} documents to ChromaDB at {db_path}")
-            
-    except Exception as e:
-        st.error(f"Error initializing ChromaDB: {e}")
-        return None, None
-        
-    return client, collection
+def get_warmup():
+    """
+    Starts loading the embedding model, vector store and retrieval backend on a
+    background thread, or connects to the shared embedding server if one is
+    configured. Runs once per server process via st.cache_resource.
+    """
+    return startup.Warmup(RETRIEVAL_BACKEND, server_socket=EMBEDDING_SERVER_SOCKET).start()
 
-@st.cache_resource
-def get_embedding_model():
-    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+@st.fragment(run_every=1)
+def render_warmup_gate(warmup):
+    """Shows warm-up progress and reruns the page once the search stack is ready."""
+    if warmup.is_done:
+        st.rerun()
+    st.info(f"⏳ {warmup.message} Your question will be answered as soon as the search index is ready.")
 
-def get_audio_file(verse_number, lang='en'):
+def get_audio_file(verse_number, lang='en', chapter=None):
     """
     Get pre-generated audio file for a verse.
-    If not found, generate it on-demand as fallback.
+    Missing clips are filled in by the background pipeline (see ensure_audio_files).
     """
-    audio_dir = os.path.join(os.getcwd(), "audio_files", lang)
-    audio_file = os.path.join(audio_dir, f"verse_{verse_number}.mp3")
+    audio_file = audio_pipeline.find_audio_file(lang, chapter, verse_number)
     
-    if os.path.exists(audio_file):
+    if audio_file is not None:
         return audio_file
     else:
-        # Fallback: generate on-demand if pre-generated file doesn't exist
-        st.warning(f"Pre-generated audio not found for verse {verse_number}. Generating now...")
+        # Never generate inline: the background pipeline fills gaps from the asset index
+        st.warning(f"Audio for verse {verse_number} is not ready yet; it is being generated in the background.")
         return None
 
-def text_to_speech_gtts(text, lang='en'):
-    """Fallback: Generates audio from text using gTTS (online, slower)."""
+@st.cache_resource
+def get_audio_store():
+    """Process-wide clip cache shared by all sessions (bounded by AUDIO_CACHE_MAX_BYTES)."""
+    return AudioStore(AUDIO_CACHE_MAX_BYTES)
+
+@st.cache_resource
+def get_audio_pack(lang):
+    """Memory-mapped audio pack for a language, or None if none has been built."""
+    return audio_pack.open_pack(lang)
+
+def get_audio_clip(verse_number, lang, chapter=None):
+    """Zero-copy memoryview of a clip from the language's pack, or None if not packed."""
+    pack = get_audio_pack(lang)
+    if pack is None or chapter is None:
+        return None
+    return pack.clip(chapter, verse_number)
+
+def audio_mime(lang):
+    """MIME type of the clips served for a language (packs may be transcoded)."""
+    pack = get_audio_pack(lang)
+    return pack.mime if pack is not None else 'audio/mp3'
+
+def read_audio_bytes(verse_number, lang, chapter=None):
+    """Reads a pre-generated clip from the pack or disk, or None if it does not exist."""
+    with metrics.span("audio_read"):
+        clip = get_audio_clip(verse_number, lang, chapter)
+        if clip is not None:
+            return bytes(clip)  # st.audio only accepts bytes; this is the single copy kept in the store
+        audio_file = get_audio_file(verse_number, lang, chapter)
+        if not audio_file:
+            return None
+        with open(audio_file, "rb") as f:
+            return f.read()
+
+def load_audio(verse_number, lang, chapter=None):
+    """Clip bytes for a verse, served from the shared audio store."""
+    with metrics.span("audio_lookup"):
+        return get_audio_store().get(
+            (chapter, verse_number, lang),
+            lambda: read_audio_bytes(verse_number, lang, chapter),
+        )
+
+@st.cache_resource
+def get_tts():
+    """Process-wide TTS backend (TTS_BACKEND) behind the synthesis cache."""
+    return tts_backends.get_tts()
+
+def text_to_speech(text, lang='en'):
+    """Fallback: synthesizes a clip in memory with the configured TTS backend (cached)."""
     try:
-        tts = gTTS(text=text, lang=lang)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-            tts.save(fp.name)
-            return fp.name
+        with metrics.span("tts"):
+            return get_tts().synthesize(text, lang)
     except Exception as e:
-        st.error(f"Error generating audio with gTTS: {e}")
+        st.error(f"Error generating audio with {get_tts().name}: {e}")
         return None
 
 # --- Callbacks ---
-def generate_audio_callback(idx, verse_number, lang):
-    """Callback to load pre-generated audio and store in session state."""
-    import time
-    
-    if 'debug_logs' not in st.session_state:
-        st.session_state['debug_logs'] = []
-    
-    start_time = time.time()
-    st.session_state['debug_logs'].append(f"Callback triggered for verse {verse_number}, index {idx}")
-    
-    print(f"DEBUG: Callback triggered for verse {verse_number}, index {idx}")
+def generate_audio_callback(idx, verse_number, lang, chapter=None):
+    """
+    Callback to load pre-generated audio into the shared audio store.
+    Session state only keeps a (verse, lang) reference, never the bytes.
+    Timings and outcomes go to the process-wide metrics (see instrumentation).
+    """
     try:
-        # Try to get pre-generated audio
-        load_start = time.time()
-        audio_file = get_audio_file(verse_number, lang)
-        load_end = time.time()
-        
-        st.session_state['debug_logs'].append(f"Audio file lookup took: {load_end - load_start:.4f}s")
-        
-        if audio_file:
-            read_start = time.time()
-            with open(audio_file, "rb") as f:
-                audio_bytes = f.read()
-            read_end = time.time()
-            
-            st.session_state['debug_logs'].append(f"File read took: {read_end - read_start:.4f}s")
-            
-            # Store in session state with a unique key using verse number
-            key = f"audio_verse_{verse_number}_{lang}" 
-            st.session_state[key] = audio_bytes
-            
-            total_time = time.time() - start_time
-            st.session_state['debug_logs'].append(f"Success! Audio loaded for {key}. Size: {len(audio_bytes)} bytes")
-            st.session_state['debug_logs'].append(f"Total callback time: {total_time:.4f}s")
-            print(f"DEBUG: Audio stored in session state: {key}")
+        with metrics.span("audio_callback"):
+            audio_bytes = load_audio(verse_number, lang, chapter)
+
+        if audio_bytes is not None:
+            # Store a reference in session state with a unique key per chapter and verse
+            key = f"audio_verse_{chapter}_{verse_number}_{lang}"
+            st.session_state[key] = (verse_number, lang, chapter)
+            metrics.event("Audio loaded", verse=verse_number, lang=lang, index=idx, bytes=len(audio_bytes))
         else:
-            st.session_state['debug_logs'].append("Pre-generated audio not found")
-            print("DEBUG: Pre-generated audio not found")
+            metrics.incr("audio_missing")
+            metrics.event("Pre-generated audio not found", verse=verse_number, lang=lang)
     except Exception as e:
-        st.session_state['debug_logs'].append(f"Exception: {str(e)}")
-        print(f"DEBUG: Exception in callback: {e}")
+        metrics.event(f"Audio callback failed: {e}", verse=verse_number, lang=lang)
 
 def clear_query_callback():
-    """Resets the query input and clears cached audio bytes.
+    """Resets the query input and clears the session's audio references.
     Must be an on_click callback so it runs before the widget is rendered,
     which is required by Streamlit when writing to a widget-bound key."""
     st.session_state['query_input'] = ''
@@ -244,10 +205,135 @@ def clear_query_callback():
     for k in keys_to_remove:
         del st.session_state[k]
 
+# --- Result Rendering ---
+
+def get_search_result(backend, query, lang, version):
+    """
+    Returns the search result for (query, lang), memoized in session state so
+    reruns triggered by audio widgets never repeat the retrieval.
+    """
+    memo_key = (query, lang, version)
+    memo = st.session_state.get('search_memo')
+    if memo is not None and memo[0] == memo_key:
+        return memo[1]
+    result = query_engine.cached_search(backend, query, lang, version, k=TOP_K)
+    startup.profile.mark("first_query")
+    st.session_state['search_memo'] = (memo_key, result)
+    return result
+
+@st.fragment
+def render_result_card(i, meta, sim_score, score_kind, context_precision, lang_choice, debug_mode):
+    """
+    Renders one retrieved verse. Runs as a fragment, so clicking one of its
+    audio buttons only reruns this card instead of the whole script.
+    """
+    if debug_mode:
+        st.json(meta.as_dict())
+
+    with st.container():
+        st.markdown(f"**Verse {meta['verse']}**")
+        
+        # Display Content
+        st.markdown(f"**Original Shloka (Kannada Script):**")
+        st.code(meta['text'], language=None)
+        
+        # Play button for original Sanskrit verse
+        sanskrit_audio_key = f"audio_verse_{meta['chapter']}_{meta['verse']}_sa"
+        sanskrit_audio = load_audio(*st.session_state[sanskrit_audio_key]) if sanskrit_audio_key in st.session_state else None
+        if sanskrit_audio is not None:
+            st.audio(sanskrit_audio, format=audio_mime('sa'))
+        else:
+            st.button(
+                f"🔊 Play Original Verse ({i+1})", 
+                key=f"play_sanskrit_{i}",
+                on_click=generate_audio_callback,
+                args=(i, meta['verse'], 'sa', meta.get('chapter'))
+            )
+        
+        st.markdown(f"**Kannada Translation:** {meta['translation']}")
+        st.markdown(f"**English Translation:** {meta['english_translation']}")
+        
+        # TTS for translation
+        tts_lang = 'en' if lang_choice == 'English' else 'kn'
+        
+        # Unique key for this result's audio state - MUST match callback key
+        audio_state_key = f"audio_verse_{meta['chapter']}_{meta['verse']}_{tts_lang}"
+        
+        if debug_mode:
+            st.write(f"Looking for key: {audio_state_key}")
+            st.write(f"Keys in session_state: {[k for k in st.session_state.keys() if k.startswith('audio_')]}")
+        
+        # Check if this session has played audio for this item; bytes come from the shared store
+        audio_data = load_audio(*st.session_state[audio_state_key]) if audio_state_key in st.session_state else None
+        if audio_data is not None:
+            st.audio(audio_data, format=audio_mime(tts_lang))
+            
+            # Add download button as fallback (downloading needs no rerun at all)
+            st.download_button(
+                label="Download Audio",
+                data=audio_data,
+                file_name=f"verse_{meta['verse']}.{'ogg' if audio_mime(tts_lang) == 'audio/ogg' else 'mp3'}",
+                mime=audio_mime(tts_lang),
+                key=f"dl_{i}",
+                on_click="ignore",
+            )
+        else:
+            # Show "Play Audio" button if not yet generated
+            st.button(
+                f"Play Audio / ಆಡಿಯೋ ಪ್ಲೇ ಮಾಡಿ ({i+1})", 
+                key=f"play_audio_{i}",
+                on_click=generate_audio_callback,
+                args=(i, meta['verse'], tts_lang, meta.get('chapter'))
+            )
+
+        # Metrics Display
+        # Answer Relevance: Measures semantic similarity between query and verse using Cosine Similarity (0 to 1).
+        # Context Precision: Ratio of retrieved verses that exceed the relevance threshold (0.3).
+        # Verses asked for by reference ("2.47") are exact matches and have no similarity score.
+        c1, c2 = st.columns(2)
+        if score_kind == "reference":
+            c1.metric("Reference Match", "Exact")
+        else:
+            c1.metric("Answer Relevance", f"{sim_score:.4f}")
+        c2.metric("Context Precision", f"{context_precision:.2f}")
+        
+        st.divider()
+
+def render_metrics_panel():
+    """Per-stage latency breakdown and recent events from the shared metrics registry."""
+    st.subheader("Latency by Stage")
+    snapshot = metrics.snapshot()
+    if snapshot['stages']:
+        st.dataframe(
+            [{"stage": name, **summary} for name, summary in snapshot['stages'].items()],
+            hide_index=True,
+        )
+    else:
+        st.caption("No timings recorded yet.")
+    if snapshot['counters']:
+        st.caption(", ".join(f"{name}: {value}" for name, value in snapshot['counters'].items()))
+
+    st.subheader("Recent Events")
+    for timestamp, message, fields in reversed(metrics.recent_events(limit=20)):
+        details = " ".join(f"{k}={v}" for k, v in fields.items())
+        st.text(f"{time.strftime('%H:%M:%S', time.localtime(timestamp))} {message} {details}".rstrip())
+
+    col1, col2 = st.columns(2)
+    if col1.button("Clear Logs"):
+        metrics.clear_events()
+    col2.download_button(
+        "Export Metrics",
+        data=metrics.to_prometheus(),
+        file_name="metrics.prom",
+        mime="text/plain",
+        on_click="ignore",
+    )
+
 # --- Main App ---
 
 def main():
     st.title("Bhagavad Gita Knowledge Repository")
+    start_exporter()  # Periodic snapshot file, if METRICS_SNAPSHOT_PATH is set
     
     # Sidebar for Debug
     with st.sidebar:
@@ -255,31 +341,23 @@ def main():
         debug_mode = st.checkbox("Show Debug Info")
         
         st.divider()
-        st.subheader("Debug Logs")
-        if 'debug_logs' in st.session_state:
-            for log in st.session_state['debug_logs']:
-                st.text(log)
-        
-        if st.button("Clear Logs"):
-            st.session_state['debug_logs'] = []
-            
+        render_metrics_panel()
+
         st.divider()
         st.subheader("Audio System Test")
         if st.button("Test Audio Playback"):
-            print("DEBUG: Test Audio Button Clicked")
+            metrics.event("Test audio requested")
             try:
                 test_text = "Testing audio system. One, two, three."
-                test_file = text_to_speech_gtts(test_text)
-                if test_file:
-                    with open(test_file, "rb") as f:
-                        test_bytes = f.read()
-                    st.audio(test_bytes, format='audio/mp3')
+                test_bytes = text_to_speech(test_text)
+                if test_bytes:
+                    st.audio(test_bytes, format=get_tts().mime)
                     st.success("Test audio generated.")
                 else:
                     st.error("Test audio generation failed.")
             except Exception as e:
                 st.error(f"Test failed: {e}")
-                print(f"DEBUG: Test Exception: {e}")
+                metrics.event(f"Test audio failed: {e}")
     
     # Global Language Selection
     lang_choice = st.radio("Select Language / ಭಾಷೆಯನ್ನು ಆಯ್ಕೆಮಾಡಿ:", ('English', 'Kannada'), horizontal=True)
@@ -292,38 +370,10 @@ def main():
         st.session_state['query_input'] = ''
         st.session_state['previous_lang'] = lang_choice
     
-    # Ensure audio files exist (auto-generates on first run)
-    ensure_audio_files()
-
-    # Initialize resources
-    client, collection = initialize_vector_store()
-    model = get_embedding_model()
-    
-    if not collection:
-        st.stop()
-        
-    if debug_mode:
-        st.write(f"Collection Count: {collection.count()}")
-
     # Sample Questions
     st.subheader("Ask a question / ಪ್ರಶ್ನೆ ಕೇಳಿ")
     
-    sample_questions = {
-        'English': [
-            "What is the nature of the soul?",
-            "What is the duty of a Kshatriya?",
-            "How to control senses?",
-            "How to find peace?"
-        ],
-        'Kannada': [
-            "ಆತ್ಮದ ಸ್ವರೂಪವೇನು?",
-            "ಕ್ಷತ್ರಿಯನ ಧರ್ಮವೇನು?",
-            "ಇಂದ್ರಿಯಗಳನ್ನು ನಿಗ್ರಹಿಸುವುದು ಹೇಗೆ?",
-            "ಶಾಂತಿಯನ್ನು ಪಡೆಯುವುದು ಹೇಗೆ?"
-        ]
-    }
-    
-    current_questions = sample_questions[lang_choice]
+    current_questions = SAMPLE_QUESTIONS[lang_choice]
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -350,110 +400,67 @@ def main():
             on_click=clear_query_callback,
         )
 
+    # Readiness gate: everything above renders immediately, search waits for warm-up
+    warmup = get_warmup()
+    if not warmup.is_done:
+        render_warmup_gate(warmup)
+        return
+    if warmup.error is not None:
+        st.error(f"Error initializing the search index: {warmup.error}")
+        st.stop()
+
+    backend = warmup.backend
+    collection_version = warmup.version
+
+    # Ensure audio files exist (generates missing clips in the background)
+    audio_generation = ensure_audio_files(collection_version)
+    if audio_generation is not None:
+        if audio_generation.is_running:
+            render_audio_generation_progress(audio_generation)
+        else:
+            render_audio_generation_outcome(audio_generation)
+
+    if debug_mode:
+        st.write(f"Collection: {collection_version} (backend: {RETRIEVAL_BACKEND})")
+        st.write(f"Startup Profile: {startup.profile.report()}")
+        st.write(f"Result Cache: {query_engine.result_cache.stats()}")
+        if RERANK and not EMBEDDING_SERVER_SOCKET:  # Otherwise reranking runs in the server
+            st.write(f"Rerank Score Cache: {reranker.get_reranker().cache.stats()}")
+        st.write(f"Audio Store: {get_audio_store().stats()}")
+        st.write(f"Audio Assets: {get_asset_index(collection_version).completeness()}")
+
     if user_query:
-        # Search
-        results_with_embeddings = collection.query(
-            query_texts=[user_query],
-            n_results=3,
-            include=['documents', 'metadatas', 'embeddings', 'distances']
-        )
-        
-        query_embedding = model.encode([user_query])
+        # Search: one embedding per query, metrics derived from the returned distances.
+        # Memoized per session and shared across sessions through the process-wide cache.
+        result = get_search_result(backend, user_query, lang_choice, collection_version)
+        if debug_mode:
+            st.write(f"Retrieval: {result.source}")
         
         # Display Results
         st.markdown("### Relevant Verses / ಸಂಬಂಧಿತ ಶ್ಲೋಕಗಳು")
         
-        ids = results_with_embeddings['ids'][0]
-        metadatas = results_with_embeddings['metadatas'][0]
-        embeddings = results_with_embeddings['embeddings'][0]
+        ids = result.ids
+        metadatas = result.metadatas
         
         if not ids:
              st.error("No results found.")
              return
-        # normalized dot product
-        top_sim = cosine_similarity(query_embedding, [embeddings[0]])[0][0]
+        top_sim = result.top_score
         
-        if top_sim < RELEVANCE_THRESHOLD:
+        if not result.is_relevant(RELEVANCE_THRESHOLD):
              msg = "This data store does not have the required answer." if lang_choice == 'English' else "ಈ ಡೇಟಾ ಸ್ಟೋರ್‌ನಲ್ಲಿ ಅಗತ್ಯವಿರುವ ಉತ್ತರವಿಲ್ಲ."
              st.warning(f"{msg} (Low relevance score: {top_sim:.2f})")
         else:
             for i in range(len(ids)):
-                meta = metadatas[i]
-                doc_embedding = embeddings[i]
-                
-                if debug_mode:
-                    st.json(meta)
-                
-                # Metrics Calculation
-                #Answer relevance 
-                sim_score = cosine_similarity(query_embedding, [doc_embedding])[0][0]
-                relevant_count = sum(1 for emb in embeddings if cosine_similarity(query_embedding, [emb])[0][0] > RELEVANCE_THRESHOLD)
-                #context precision
-                context_precision = relevant_count / len(ids)
-                
-                with st.container():
-                    st.markdown(f"**Verse {meta['verse']}**")
-                    
-                    # Display Content
-                    st.markdown(f"**Original Shloka (Kannada Script):**")
-                    st.code(meta['text'], language=None)
-                    
-                    # Play button for original Sanskrit verse
-                    sanskrit_audio_key = f"audio_verse_{meta['verse']}_sa"
-                    if sanskrit_audio_key in st.session_state:
-                        st.audio(st.session_state[sanskrit_audio_key], format='audio/mp3')
-                    else:
-                        st.button(
-                            f"🔊 Play Original Verse ({i+1})", 
-                            key=f"play_sanskrit_{i}",
-                            on_click=generate_audio_callback,
-                            args=(i, meta['verse'], 'sa')
-                        )
-                    
-                    st.markdown(f"**Kannada Translation:** {meta['translation']}")
-                    st.markdown(f"**English Translation:** {meta['english_translation']}")
-                    
-                    # TTS for translation
-                    text_to_speak = meta['english_translation'] if lang_choice == 'English' else meta['translation']
-                    tts_lang = 'en' if lang_choice == 'English' else 'kn'
-                    
-                    # Unique key for this result's audio state - MUST match callback key
-                    audio_state_key = f"audio_verse_{meta['verse']}_{tts_lang}"
-                    
-                    if debug_mode:
-                        st.write(f"Looking for key: {audio_state_key}")
-                        st.write(f"Keys in session_state: {[k for k in st.session_state.keys() if k.startswith('audio_')]}")
-                    
-                    # Check if audio exists in session state for this item
-                    if audio_state_key in st.session_state:
-                        audio_data = st.session_state[audio_state_key]
-                        st.audio(audio_data, format='audio/mp3')
-                        
-                        # Add download button as fallback
-                        st.download_button(
-                            label="Download Audio",
-                            data=audio_data,
-                            file_name=f"verse_{meta['verse']}.mp3",
-                            mime="audio/mp3",
-                            key=f"dl_{i}"
-                        )
-                    else:
-                        # Show "Play Audio" button if not yet generated
-                        st.button(
-                            f"Play Audio / ಆಡಿಯೋ ಪ್ಲೇ ಮಾಡಿ ({i+1})", 
-                            key=f"play_audio_{i}",
-                            on_click=generate_audio_callback,
-                            args=(i, meta['verse'], tts_lang)
-                        )
-
-                    # Metrics Display
-                    # Answer Relevance: Measures semantic similarity between query and verse using Cosine Similarity (0 to 1).
-                    # Context Precision: Ratio of retrieved verses that exceed the relevance threshold (0.3).
-                    c1, c2 = st.columns(2)
-                    c1.metric("Answer Relevance", f"{sim_score:.4f}")
-                    c2.metric("Context Precision", f"{context_precision:.2f}")
-                    
-                    st.divider()
+                render_result_card(
+                    i,
+                    metadatas[i],
+                    float(result.scores[i]),
+                    result.score_kind,
+                    result.context_precision,
+                    lang_choice,
+                    debug_mode,
+                )
 
 if __name__ == "__main__":
     main()
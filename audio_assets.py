@@ -0,0 +1,159 @@
+"""
+Per-language completeness index for the audio assets.
+
+Tracks, for every (verse, language), whether a clip is present (as a loose
+MP3 or inside a pack) together with its size and hash. The index is cached
+in a manifest; at startup it is trusted as long as a cheap fingerprint (the
+corpus version plus the mtimes of the audio directories and packs) still
+matches, so checking completeness is O(1) instead of globbing directories.
+Missing clips are reported so they can be generated in the background.
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from audio_pack import open_pack, pack_path
+from audio_pipeline import clip_key, find_audio_file, write_atomic
+from config import AUDIO_DIR, AUDIO_LANGS, AUDIO_PACK_DIR, AUDIO_ASSET_INDEX
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(corpus_version, langs=tuple(AUDIO_LANGS), audio_dir=AUDIO_DIR, pack_dir=AUDIO_PACK_DIR):
+    """
+    Cheap summary of the asset state: one stat per language directory and pack.
+    Atomic renames into a directory update its mtime, so any added or removed
+    clip changes the fingerprint.
+    """
+    parts = [str(corpus_version)]
+    for lang in langs:
+        for path in (Path(audio_dir) / lang, pack_path(lang, pack_dir)):
+            try:
+                parts.append(f"{path}:{path.stat().st_mtime_ns}")
+            except FileNotFoundError:
+                parts.append(f"{path}:-")
+    return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+class AssetIndex:
+    """Expected vs present clips per (verse, language), persisted as JSON."""
+
+    def __init__(self, path=AUDIO_ASSET_INDEX, audio_dir=AUDIO_DIR, pack_dir=AUDIO_PACK_DIR):
+        self.path = Path(path)
+        self.audio_dir = audio_dir
+        self.pack_dir = pack_dir
+        self.fingerprint = None
+        self.clips = {}  # key -> {"lang", "chapter", "verse", "present", "size", "hash", "source"}
+        self._lock = threading.Lock()
+
+    # --- Persistence ---
+
+    @classmethod
+    def load(cls, path=AUDIO_ASSET_INDEX, **kwargs):
+        index = cls(path, **kwargs)
+        try:
+            with open(index.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            index.fingerprint = data.get('fingerprint')
+            index.clips = data.get('clips', {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return index
+
+    def save(self):
+        with self._lock:
+            payload = json.dumps(
+                {'fingerprint': self.fingerprint, 'clips': self.clips},
+                ensure_ascii=False,
+                separators=(',', ':'),
+            )
+        write_atomic(self.path, payload.encode('utf-8'))
+
+    @classmethod
+    def load_or_build(cls, corpus_version, verses_factory, langs=tuple(AUDIO_LANGS), **kwargs):
+        """
+        Returns the cached index when its fingerprint still matches (O(1));
+        otherwise rescans against the corpus from verses_factory() and saves.
+        """
+        index = cls.load(**kwargs)
+        current = fingerprint(corpus_version, langs, index.audio_dir, index.pack_dir)
+        if index.fingerprint != current or not index.clips:
+            index.rebuild(verses_factory(), langs)
+            index.fingerprint = current
+            index.save()
+        return index
+
+    # --- Scanning ---
+
+    def rebuild(self, verses, langs=tuple(AUDIO_LANGS)):
+        """Rescans every expected clip. Unchanged files reuse their recorded hash."""
+        previous = self.clips
+        packs = {lang: open_pack(lang, self.pack_dir) for lang in langs}
+        clips = {}
+        for verse in verses:
+            for lang in langs:
+                key = clip_key(lang, verse['chapter'], verse['verse'])
+                entry = {'lang': lang, 'chapter': verse['chapter'], 'verse': verse['verse'], 'present': False}
+                pack = packs[lang]
+                path = find_audio_file(lang, verse['chapter'], verse['verse'], self.audio_dir)
+                packed = pack.entry(verse['chapter'], verse['verse']) if pack is not None else None
+                if packed is not None:
+                    _, length, crc = packed
+                    entry.update(present=True, size=length, hash=f"crc32:{crc:08x}", source='pack')
+                elif path is not None:
+                    stat = path.stat()
+                    old = previous.get(key, {})
+                    if old.get('source') == 'file' and old.get('size') == stat.st_size and old.get('mtime') == stat.st_mtime_ns:
+                        digest = old['hash']
+                    else:
+                        digest = f"sha256:{_file_digest(path)}"
+                    entry.update(present=True, size=stat.st_size, mtime=stat.st_mtime_ns, hash=digest, source='file')
+                clips[key] = entry
+        with self._lock:
+            self.clips = clips
+
+    def mark_present(self, key, path):
+        """Records a freshly generated clip without rescanning."""
+        path = Path(path)
+        stat = path.stat()
+        with self._lock:
+            entry = self.clips.get(key)
+            if entry is not None:
+                entry.update(
+                    present=True, size=stat.st_size, mtime=stat.st_mtime_ns,
+                    hash=f"sha256:{_file_digest(path)}", source='file',
+                )
+
+    def refresh_fingerprint(self, corpus_version, langs=tuple(AUDIO_LANGS)):
+        self.fingerprint = fingerprint(corpus_version, langs, self.audio_dir, self.pack_dir)
+
+    # --- Queries ---
+
+    def missing(self):
+        """Keys of the clips that are expected but not present."""
+        with self._lock:
+            return {key for key, entry in self.clips.items() if not entry['present']}
+
+    def is_present(self, lang, chapter, verse_number):
+        entry = self.clips.get(clip_key(lang, chapter, verse_number))
+        return bool(entry and entry['present'])
+
+    def completeness(self):
+        """{lang: {"expected": n, "present": m, "bytes": total size}}"""
+        summary = {}
+        with self._lock:
+            for entry in self.clips.values():
+                lang = summary.setdefault(entry['lang'], {'expected': 0, 'present': 0, 'bytes': 0})
+                lang['expected'] += 1
+                if entry['present']:
+                    lang['present'] += 1
+                    lang['bytes'] += entry.get('size', 0)
+        return summary
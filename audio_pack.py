@@ -0,0 +1,186 @@
+"""
+Packed audio archives: one file per language holding every clip.
+
+Thousands of small MP3 files mean thousands of open/stat calls and poor
+cache locality. A pack stores the clips back to back, followed by a compact
+binary index of (chapter, verse) -> (offset, length, crc32) and a checksum
+of that index. Readers mmap the pack once and hand out clips as zero-copy
+memoryview slices.
+
+Layout (little-endian):
+    header   "<8sHHIQ"  magic, format version, codec id, entry count, index offset
+    clips    concatenated clip bytes
+    index    count x "<IIQII"  chapter, verse, offset, length, crc32
+    trailer  "<I"       crc32 of the index bytes
+
+Usage:
+    python audio_pack.py                     # pack en, kn and sa as-is
+    python audio_pack.py --bitrate 32k       # re-encode MP3 at a lower bitrate
+    python audio_pack.py --codec opus        # transcode to Ogg/Opus (needs ffmpeg)
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import subprocess
+import zlib
+from pathlib import Path
+
+from config import AUDIO_DIR, AUDIO_LANGS, AUDIO_PACK_DIR
+
+MAGIC = b"GITAPAK1"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHIQ")
+ENTRY = struct.Struct("<IIQII")
+TRAILER = struct.Struct("<I")
+
+CODECS = {0: ("mp3", "audio/mp3"), 1: ("opus", "audio/ogg")}
+CODEC_IDS = {name: codec_id for codec_id, (name, _) in CODECS.items()}
+
+
+class PackError(Exception):
+    """Raised when a pack file is missing, truncated or corrupt."""
+
+
+def pack_path(lang, pack_dir=AUDIO_PACK_DIR):
+    return Path(pack_dir) / f"{lang}.gpak"
+
+
+def transcode(data, codec="mp3", bitrate=None):
+    """Re-encodes one clip through ffmpeg (stdin -> stdout)."""
+    if codec == "mp3" and bitrate is None:
+        return data
+    args = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0"]
+    if codec == "opus":
+        args += ["-c:a", "libopus", "-b:a", bitrate or "24k", "-f", "ogg"]
+    else:
+        args += ["-c:a", "libmp3lame", "-b:a", bitrate, "-f", "mp3"]
+    result = subprocess.run(args + ["pipe:1"], input=data, capture_output=True, check=True)
+    return result.stdout
+
+
+def write_pack(path, clips, codec="mp3", bitrate=None):
+    """
+    Writes clips, an iterable of ((chapter, verse), bytes), to a pack file.
+    Clips are streamed to disk one at a time; the pack is renamed into place last.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    entries = []
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, CODEC_IDS[codec], 0, 0))
+        for (chapter, verse), data in clips:
+            data = transcode(data, codec, bitrate)
+            entries.append((chapter, verse, f.tell(), len(data), zlib.crc32(data)))
+            f.write(data)
+        index_offset = f.tell()
+        index = b"".join(ENTRY.pack(*entry) for entry in sorted(entries))
+        f.write(index)
+        f.write(TRAILER.pack(zlib.crc32(index)))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, CODEC_IDS[codec], len(entries), index_offset))
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+class AudioPack:
+    """Read-only, memory-mapped view of one pack file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        if len(self._mmap) < HEADER.size + TRAILER.size:
+            raise PackError(f"{self.path} is truncated")
+
+        magic, version, codec_id, count, index_offset = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise PackError(f"{self.path} is not a version {FORMAT_VERSION} audio pack")
+        index_end = index_offset + count * ENTRY.size
+        if index_end + TRAILER.size > len(self._mmap):
+            raise PackError(f"{self.path} is truncated")
+        (index_crc,) = TRAILER.unpack_from(self._mmap, index_end)
+        if zlib.crc32(self._view[index_offset:index_end]) != index_crc:
+            raise PackError(f"{self.path} has a corrupt index")
+
+        self.codec, self.mime = CODECS[codec_id]
+        self._index = {
+            (chapter, verse): (offset, length, crc)
+            for chapter, verse, offset, length, crc in ENTRY.iter_unpack(self._view[index_offset:index_end])
+        }
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def keys(self):
+        return self._index.keys()
+
+    def entry(self, chapter, verse):
+        """(offset, length, crc32) of one clip, or None."""
+        return self._index.get((chapter, verse))
+
+    def clip(self, chapter, verse, verify=False):
+        """Zero-copy memoryview of one clip, or None if the pack does not hold it."""
+        entry = self._index.get((chapter, verse))
+        if entry is None:
+            return None
+        offset, length, crc = entry
+        view = self._view[offset:offset + length]
+        if verify and zlib.crc32(view) != crc:
+            raise PackError(f"Checksum mismatch for chapter {chapter} verse {verse} in {self.path}")
+        return view
+
+    def verify(self):
+        """Checks every clip's checksum. Returns the keys that fail."""
+        return [key for key in self._index if zlib.crc32(self.clip(*key)) != self._index[key][2]]
+
+
+def open_pack(lang, pack_dir=AUDIO_PACK_DIR):
+    """Opens the pack for a language, or returns None if there is no valid one."""
+    path = pack_path(lang, pack_dir)
+    if not path.exists():
+        return None
+    try:
+        return AudioPack(path)
+    except (PackError, OSError, ValueError) as e:
+        print(f"Ignoring audio pack {path}: {e}")
+        return None
+
+
+def iter_clip_files(lang, verses, audio_dir=AUDIO_DIR):
+    """Yields ((chapter, verse), bytes) for every verse whose MP3 file exists."""
+    from audio_pipeline import find_audio_file
+
+    for verse in verses:
+        path = find_audio_file(lang, verse['chapter'], verse['verse'], audio_dir)
+        if path is not None:
+            yield (verse['chapter'], verse['verse']), path.read_bytes()
+
+
+def main():
+    from verse_store import get_store
+
+    parser = argparse.ArgumentParser(description="Pack per-verse audio files into one archive per language.")
+    parser.add_argument("--langs", nargs="+", default=list(AUDIO_LANGS))
+    parser.add_argument("--codec", choices=sorted(CODEC_IDS), default="mp3")
+    parser.add_argument("--bitrate", default=None, help="Re-encode at this bitrate, e.g. 32k (needs ffmpeg)")
+    parser.add_argument("--out", default=AUDIO_PACK_DIR)
+    args = parser.parse_args()
+
+    for lang in args.langs:
+        verses = get_store()
+        path = pack_path(lang, args.out)
+        count = write_pack(path, iter_clip_files(lang, verses), codec=args.codec, bitrate=args.bitrate)
+        bad = AudioPack(path).verify()
+        status = "OK" if not bad else f"{len(bad)} corrupt clip(s)"
+        print(f"[{lang}] {count} clips -> {path} ({path.stat().st_size / 1024:.1f} KB, {status})")
+
+
+if __name__ == "__main__":
+    main()
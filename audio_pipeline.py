@@ -0,0 +1,329 @@
+"""
+Shared audio generation pipeline used by the app and the CLI scripts.
+
+Clips are synthesized by a bounded thread pool through the configured TTS
+backend (see tts_backends). For remote backends a token bucket keeps the
+request rate under the service's limits; local ones run one synthesis per
+CPU instead. Failed calls are retried with
+exponential backoff (falling back to alternate language codes), every clip
+is written atomically via temp file + rename, and a job manifest records
+progress so an interrupted run resumes where it stopped. Clips that failed
+in AUDIO_MAX_FAILED_RUNS runs in a row are reported and no longer attempted.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from config import (
+    AUDIO_DIR, AUDIO_LANGS, AUDIO_WORKERS, AUDIO_RATE_PER_SECOND,
+    AUDIO_BURST, AUDIO_MAX_RETRIES, AUDIO_JOB_MANIFEST, AUDIO_MAX_FAILED_RUNS, AUDIO_LEGACY_CHAPTER,
+)
+from instrumentation import metrics
+from tts_backends import get_tts
+
+
+def audio_path(lang, chapter, verse_number, audio_dir=AUDIO_DIR):
+    """Location of the pre-generated clip for one verse in one language."""
+    return Path(audio_dir) / lang / f"ch{chapter}" / f"verse_{verse_number}.mp3"
+
+
+def find_audio_file(lang, chapter, verse_number, audio_dir=AUDIO_DIR):
+    """
+    The existing clip file for a verse, or None. Clips of AUDIO_LEGACY_CHAPTER
+    generated before paths included the chapter are found at their old path.
+    """
+    path = audio_path(lang, chapter, verse_number, audio_dir)
+    if path.exists():
+        return path
+    if chapter == AUDIO_LEGACY_CHAPTER:
+        legacy = Path(audio_dir) / lang / f"verse_{verse_number}.mp3"
+        if legacy.exists():
+            return legacy
+    return None
+
+
+def clip_key(lang, chapter, verse_number):
+    """Stable identifier of one clip, shared by job manifests and the asset index."""
+    return f"{lang}/ch{chapter}_v{verse_number}"
+
+
+@dataclass
+class AudioJob:
+    """One clip to synthesize. lang_codes are tried in order."""
+    key: str
+    text: str
+    lang_codes: tuple
+    out_path: Path
+
+
+def build_jobs(verses, langs=tuple(AUDIO_LANGS), audio_dir=AUDIO_DIR):
+    """Creates a job per (verse, language) from verse dicts."""
+    jobs = []
+    for verse in verses:
+        for lang in langs:
+            field_name, lang_codes = AUDIO_LANGS[lang]
+            jobs.append(AudioJob(
+                key=clip_key(lang, verse['chapter'], verse['verse']),
+                text=verse[field_name],
+                lang_codes=tuple(lang_codes),
+                out_path=(
+                    find_audio_file(lang, verse['chapter'], verse['verse'], audio_dir)
+                    or audio_path(lang, verse['chapter'], verse['verse'], audio_dir)
+                ),
+            ))
+    return jobs
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter shared by all worker threads."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def write_atomic(path, data):
+    """Writes bytes to a temp file in the same directory, then renames it into place."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+@dataclass
+class PipelineStatus:
+    """Progress of a pipeline run; safe to read from other threads."""
+    total: int = 0
+    done: int = 0
+    succeeded: int = 0
+    skipped: int = 0
+    failed: int = 0
+    running: bool = False
+    errors: dict = field(default_factory=dict)
+    abandoned: list = field(default_factory=list)  # Keys not attempted after repeated failed runs
+
+    @property
+    def fraction(self):
+        return self.done / self.total if self.total else 1.0
+
+
+class JobManifest:
+    """
+    Append-only log of finished and failed jobs (one JSON object per line).
+    Appending keeps each update O(1); the latest line for a key wins on load,
+    and the file is rewritten with one line per key when it holds more.
+    Failed entries count the runs in a row the job has failed.
+    """
+
+    def __init__(self, path=AUDIO_JOB_MANIFEST, max_failed_runs=AUDIO_MAX_FAILED_RUNS):
+        self.path = Path(path)
+        self.max_failed_runs = max_failed_runs
+        self._lock = threading.Lock()
+        self.entries = {}
+        lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from an interrupted run
+                    self.entries[entry['key']] = entry
+        except FileNotFoundError:
+            pass
+        if lines > len(self.entries):
+            self.compact()
+
+    def compact(self):
+        """Rewrites the log with only the latest entry per key."""
+        with self._lock:
+            data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self.entries.values())
+            write_atomic(self.path, data.encode('utf-8'))
+
+    def abandoned(self, job):
+        """True if the job failed in the last max_failed_runs runs and should not be attempted again."""
+        entry = self.entries.get(job.key)
+        return entry is not None and entry.get('failures', 0) >= self.max_failed_runs
+
+    def record(self, job, status, error=None):
+        entry = {'key': job.key, 'status': status, 'updated': time.time()}
+        if error:
+            entry['error'] = error
+        with self._lock:
+            if status == 'failed':
+                entry['failures'] = self.entries.get(job.key, {}).get('failures', 0) + 1
+            self.entries[job.key] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class AudioPipeline:
+    """Runs AudioJobs concurrently with rate limiting, retries and resume."""
+
+    def __init__(
+        self,
+        tts=None,
+        workers=AUDIO_WORKERS,
+        rate_per_second=AUDIO_RATE_PER_SECOND,
+        burst=AUDIO_BURST,
+        max_retries=AUDIO_MAX_RETRIES,
+        manifest_path=AUDIO_JOB_MANIFEST,
+        synthesize=None,
+    ):
+        # Each clip is synthesized once and written to disk, so caching it would only cost memory
+        self.tts = tts or get_tts(cached=False)
+        self.synthesize = synthesize or self.tts.synthesize
+        self.max_retries = max_retries
+        if self.tts.rate_limited:
+            self.workers = workers
+            self.limiter = TokenBucket(rate_per_second, burst)
+        else:
+            # Local engines are bounded by CPU, not by a remote rate limit
+            self.workers = max(workers, os.cpu_count() or 1)
+            self.limiter = None
+        self.manifest = JobManifest(manifest_path)
+        self.status = PipelineStatus()
+        self._status_lock = threading.Lock()
+        self._thread = None
+
+    def _synthesize_with_retry(self, job):
+        last_error = None
+        for lang in job.lang_codes:
+            for attempt in range(self.max_retries + 1):
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                try:
+                    with metrics.span("tts"):
+                        return self.synthesize(job.text, lang)
+                except Exception as e:
+                    last_error = e
+                    if attempt < self.max_retries:
+                        # Exponential backoff with jitter: 1s, 2s, 4s, ... (capped)
+                        time.sleep(min(30.0, 2 ** attempt) * (0.5 + random.random() / 2))
+        raise last_error
+
+    def _run_job(self, job, on_progress):
+        outcome = 'skipped'
+        error = None
+        # Writes are atomic, so an existing file is always a complete clip
+        if not job.out_path.exists():
+            try:
+                write_atomic(job.out_path, self._synthesize_with_retry(job))
+                self.manifest.record(job, 'done')
+                outcome = 'succeeded'
+            except Exception as e:
+                error = str(e)
+                self.manifest.record(job, 'failed', error)
+                outcome = 'failed'
+                print(f"Audio gen error for {job.key}: {e}")
+
+        with self._status_lock:
+            self.status.done += 1
+            setattr(self.status, outcome, getattr(self.status, outcome) + 1)
+            if error:
+                self.status.errors[job.key] = error
+        if on_progress:
+            on_progress(self.status, job, outcome)
+
+    def run(self, jobs, on_progress=None):
+        """Processes all jobs and blocks until they finish. Returns the final status."""
+        abandoned = [job.key for job in jobs if self.manifest.abandoned(job) and not job.out_path.exists()]
+        if abandoned:
+            skip = set(abandoned)
+            jobs = [job for job in jobs if job.key not in skip]
+            print(f"Not retrying {len(abandoned)} clip(s) that failed in {self.manifest.max_failed_runs} runs "
+                  f"in a row (see {self.manifest.path}).")
+        with self._status_lock:
+            self.status = PipelineStatus(total=len(jobs), running=True, abandoned=abandoned)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="audio-gen") as pool:
+                for future in [pool.submit(self._run_job, job, on_progress) for job in jobs]:
+                    future.result()
+        finally:
+            self.status.running = False
+        return self.status
+
+    def start(self, jobs, on_progress=None):
+        """Runs the jobs on a daemon thread and returns immediately."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self.status = PipelineStatus(total=len(jobs), running=True)
+        self._thread = threading.Thread(
+            target=self.run, args=(jobs, on_progress), name="audio-pipeline", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+
+def run_cli(title, langs):
+    """Shared entry point for the generate_audio*.py scripts."""
+    import argparse
+
+    from config import TTS_BACKEND
+    from verse_store import get_store
+    from tts_backends import BACKENDS
+
+    parser = argparse.ArgumentParser(description=title)
+    parser.add_argument("--tts", choices=sorted(BACKENDS), default=TTS_BACKEND, help="TTS backend")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
+
+    print("\nLoading data...")
+    verses = get_store()
+    jobs = build_jobs(verses, langs)
+    print(f"Found {len(verses)} verses, {len(jobs)} clips to check.\n")
+
+    def report(status, job, outcome):
+        print(f"  [{status.done}/{status.total}] {job.key}: {outcome}")
+
+    print(f"TTS backend: {args.tts}")
+    status = AudioPipeline(tts=get_tts(args.tts, cached=False)).run(jobs, on_progress=report)
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    print(f"Total clips checked: {status.total}")
+    print(f"Audio files generated: {status.succeeded}")
+    print(f"Already present: {status.skipped}")
+    print(f"Errors: {status.failed}")
+    if status.abandoned:
+        print(f"Not retried after repeated failures: {', '.join(status.abandoned)}")
+    print(f"\nAudio files saved in: {Path(AUDIO_DIR).absolute()}")
+    print("=" * 60)
+    return status
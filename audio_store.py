@@ -0,0 +1,78 @@
+"""
+Process-wide store for audio clip bytes.
+
+Sessions keep only a (verse, lang) reference in session_state; the bytes
+themselves live here once per process, in an LRU bounded by a byte budget.
+A hundred users listening to the same verse therefore cost one copy.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class AudioStore:
+    """Thread-safe LRU of clip bytes bounded by total size, with hit/miss stats."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._clips = OrderedDict()  # key -> bytes
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, loader):
+        """
+        Returns the bytes for key, calling loader() to fetch them on a miss.
+        Returns None (and caches nothing) when the loader has no clip.
+        """
+        with self._lock:
+            data = self._clips.get(key)
+            if data is not None:
+                self._clips.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        data = loader()
+        if data is None:
+            return None
+        self.put(key, data)
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return  # Never worth evicting everything else for one clip
+        with self._lock:
+            previous = self._clips.pop(key, None)
+            if previous is not None:
+                self.resident_bytes -= len(previous)
+            self._clips[key] = data
+            self.resident_bytes += len(data)
+            while self.resident_bytes > self.max_bytes:
+                _, evicted = self._clips.popitem(last=False)
+                self.resident_bytes -= len(evicted)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._clips
+
+    def clear(self):
+        with self._lock:
+            self._clips.clear()
+            self.resident_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "clips": len(self._clips),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
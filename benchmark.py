@@ -0,0 +1,315 @@
+"""
+Reproducible benchmark suite for the retrieval and audio stacks.
+
+Measures, for each configured corpus size:
+  - cold start: interpreter + imports + model load, in fresh subprocesses
+  - index build: streaming ingestion (embed + upsert) into a scratch collection
+  - query latency: single-query search on each retrieval backend
+  - batch throughput: batched search on each retrieval backend
+  - result cache hits
+  - audio serving: loose file reads, shared audio store hits and pack slices
+
+Every stage reports p50/p95/p99 latency and throughput, and the change in
+current RSS across it (cold start reports the fresh process's RSS). Corpora
+larger than the real chapter are synthesized from its verses. Results are
+written as JSON so runs can be compared between commits.
+
+Usage:
+    python benchmark.py                          # sizes 72 and 700
+    python benchmark.py --sizes 72 700 10000 --output bench_results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import ingest
+import query_engine
+import retrieval_backends
+from audio_pack import AudioPack, write_pack
+from audio_store import AudioStore
+from config import TOP_K, SAMPLE_QUESTIONS, SAMPLE_QUERIES_PATH, AUDIO_DIR
+from result_cache import ResultCache
+from verse_store import VerseStore, get_store
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb():
+    """Current resident set size of this process in MiB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+def with_rss_delta(stats, rss_before):
+    """Adds the change in current RSS since rss_before (MiB) to a stage's stats."""
+    rss_after = current_rss_mb()
+    stats["rss_delta_mb"] = round(rss_after - rss_before, 1) if None not in (rss_before, rss_after) else None
+    return stats
+
+
+def summarize(samples, items_per_sample=1):
+    """Latency percentiles (ms) and throughput for a list of durations in seconds."""
+    samples = np.asarray(samples, dtype=np.float64)
+    total = samples.sum()
+    return {
+        "n": int(samples.size),
+        "p50_ms": float(np.percentile(samples, 50) * 1000),
+        "p95_ms": float(np.percentile(samples, 95) * 1000),
+        "p99_ms": float(np.percentile(samples, 99) * 1000),
+        "mean_ms": float(samples.mean() * 1000),
+        "throughput_per_s": float(samples.size * items_per_sample / total) if total > 0 else None,
+    }
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def benchmark_queries():
+    queries = [q for questions in SAMPLE_QUESTIONS.values() for q in questions]
+    queries += [q for q, _ in query_engine.load_sample_queries(SAMPLE_QUERIES_PATH)]
+    return list(dict.fromkeys(queries))
+
+
+def synthetic_verses(base_verses, size):
+    """
+    Yields `size` verses. The real verses come first; beyond that, synthetic
+    verses splice two real ones so that no two embeddings are identical.
+    """
+    n = len(base_verses)
+    for i in range(size):
+        base = base_verses[i % n]
+        if i < n:
+            yield base
+            continue
+        other = base_verses[(i * 7 + 3) % n]
+        yield {
+            "chapter": 1000 + i // n,
+            "verse": i % n + 1,
+            "text": f"{base['text']} {other['text'][:60]}",
+            "translation": f"{base['translation']} {other['translation'][:80]}",
+            "english_translation": f"{base['english_translation']} {other['english_translation'][:80]}",
+        }
+
+
+# --- Stages ---
+
+def bench_cold_start(runs):
+    """Import + model load in fresh interpreters (the first page load's floor), and their RSS after it."""
+    code = (
+        "import time; t = time.perf_counter(); import query_engine; "
+        "query_engine.get_model(); elapsed = time.perf_counter() - t; "
+        "from benchmark import current_rss_mb; print(elapsed, current_rss_mb())"
+    )
+    samples, rss = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        elapsed, rss_mb = out.stdout.strip().splitlines()[-1].split()
+        samples.append(float(elapsed))
+        if rss_mb != "None":
+            rss.append(float(rss_mb))
+    stats = summarize(samples)
+    stats["rss_mb"] = round(max(rss), 1) if rss else None
+    return stats
+
+
+def bench_index_build(verses, workdir):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=str(workdir / "chroma"))
+    collection = query_engine.get_collection(client, "bench")
+    batch_times = []
+    last = [time.perf_counter()]
+
+    def on_progress(_):
+        now = time.perf_counter()
+        batch_times.append(now - last[0])
+        last[0] = now
+
+    start = time.perf_counter()
+    count = ingest.ingest(collection, iter(verses), on_progress=on_progress)
+    elapsed = time.perf_counter() - start
+    stats = summarize(batch_times or [elapsed])
+    stats.update(total_s=elapsed, verses=count, verses_per_s=count / elapsed if elapsed else None)
+    return collection, stats
+
+
+def bench_backends(collection, store, workdir, queries, repeats):
+    version = f"bench:{collection.count()}"
+    results = {}
+    for kind in ("chroma", "numpy"):
+        start = time.perf_counter()
+        backend = retrieval_backends.create_backend(
+            kind, collection, version, index_dir=str(workdir / "numpy"), store=store
+        )
+        open_s = time.perf_counter() - start
+
+        single = []
+        for _ in range(repeats):
+            for query in queries:
+                single.extend(timed(lambda: query_engine.search(backend, query, k=TOP_K), 1))
+        batch = timed(lambda: query_engine.search_batch(backend, queries, k=TOP_K), repeats)
+
+        results[kind] = {
+            "open_s": open_s,
+            "single_query": summarize(single),
+            "batch_query": summarize(batch, items_per_sample=len(queries)),
+        }
+
+    # Retrieval alone (embedding excluded) to isolate backend cost
+    embeddings = query_engine.embed(queries)
+    for kind in ("chroma", "numpy"):
+        backend = retrieval_backends.create_backend(
+            kind, collection, version, index_dir=str(workdir / "numpy"), store=store
+        )
+        samples = []
+        for _ in range(repeats):
+            for row in embeddings:
+                samples.extend(timed(lambda: backend.search(row[None, :], TOP_K), 1))
+        results[kind]["retrieval_only"] = summarize(samples)
+
+    results["embed_only"] = summarize(
+        [t for _ in range(repeats) for query in queries for t in timed(lambda: query_engine.embed([query]), 1)]
+    )
+    return results
+
+
+def bench_result_cache(queries, repeats):
+    cache = ResultCache()
+    keys = [ResultCache.make_key(q, "English", TOP_K, "bench") for q in queries]
+    for key in keys:
+        cache.put(key, object())
+    samples = [t for _ in range(repeats * 100) for key in keys for t in timed(lambda: cache.get(key), 1)]
+    return summarize(samples)
+
+
+def bench_audio(workdir, verses, repeats):
+    """Compares reading loose MP3s, shared-store hits and pack slices."""
+    from audio_pipeline import find_audio_file
+
+    real_files = [find_audio_file("en", v["chapter"], v["verse"], AUDIO_DIR) for v in verses]
+    real_files = [p for p in real_files if p is not None]
+    if not real_files:
+        # No generated audio on this machine: use synthetic ~100 KB clips
+        synthetic_dir = workdir / "audio" / "en"
+        synthetic_dir.mkdir(parents=True, exist_ok=True)
+        rng = np.random.default_rng(0)
+        for v in verses:
+            (synthetic_dir / f"ch{v['chapter']}_verse_{v['verse']}.mp3").write_bytes(rng.bytes(100 * 1024))
+        real_files = sorted(synthetic_dir.glob("*.mp3"))
+
+    def read_all():
+        for path in real_files:
+            with open(path, "rb") as f:
+                f.read()
+
+    store = AudioStore(max_bytes=1 << 30)
+    for path in real_files:
+        store.get(path.name, path.read_bytes)
+
+    pack_file = workdir / "en.gpak"
+    write_pack(pack_file, (((2, i), p.read_bytes()) for i, p in enumerate(real_files)))
+    pack = AudioPack(pack_file)
+    keys = list(pack.keys())
+
+    n = len(real_files)
+    return {
+        "clips": n,
+        "file_read": summarize(timed(read_all, repeats), items_per_sample=n),
+        "store_hit": summarize(
+            timed(lambda: [store.get(p.name, p.read_bytes) for p in real_files], repeats), items_per_sample=n
+        ),
+        "pack_slice": summarize(timed(lambda: [pack.clip(*k) for k in keys], repeats), items_per_sample=n),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start, indexing, queries and audio serving.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[72, 700], help="Corpus sizes (verses)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--cold-runs", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    base_verses = list(get_store())
+    queries = benchmark_queries()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "queries": len(queries),
+        "stages": {},
+    }
+
+    print(f"Cold start ({args.cold_runs} runs)...")
+    report["stages"]["cold_start"] = bench_cold_start(args.cold_runs)
+
+    query_engine.get_model()
+    rss = current_rss_mb()
+    report["stages"]["result_cache_hit"] = with_rss_delta(bench_result_cache(queries, args.repeats), rss)
+
+    for size in args.sizes:
+        print(f"Corpus of {size} verses...")
+        workdir = Path(tempfile.mkdtemp(prefix=f"gita_bench_{size}_"))
+        try:
+            verses = list(synthetic_verses(base_verses, size))
+            rss = current_rss_mb()
+            collection, build = bench_index_build(verses, workdir)
+            build = with_rss_delta(build, rss)
+            rss = current_rss_mb()
+            query = bench_backends(collection, VerseStore(verses), workdir, queries, args.repeats)
+            report["stages"][f"corpus_{size}"] = {"index_build": build, "query": with_rss_delta(query, rss)}
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    workdir = Path(tempfile.mkdtemp(prefix="gita_bench_audio_"))
+    try:
+        rss = current_rss_mb()
+        report["stages"]["audio"] = with_rss_delta(bench_audio(workdir, base_verses, args.repeats), rss)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report["peak_rss_mb"] = round(peak_rss_mb(), 1)  # Whole run
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Shared configuration for the app, the query engine and the offline scripts.
+"""
+
+import os
+
+# --- Data ---
+JSON_FILE_PATH = "bhagavadgita_Chapter_2.json"
+# Chapter files to index (glob patterns allowed), e.g. "data/bhagavadgita_Chapter_*.json"
+CORPUS_FILES = [JSON_FILE_PATH]
+AUDIO_DIR = "audio_files"
+DB_PATH = os.path.join(os.getcwd(), "chroma_db")
+# Model, indexed languages and per-verse content hashes of what is indexed
+MANIFEST_PATH = os.path.join(os.getcwd(), "chroma_db_manifest.json")
+# Prebuilt index (see snapshot.py); bulk-loaded at startup when the database is missing
+SNAPSHOT_PATH = os.path.join(os.getcwd(), "gita_index.gsnap")
+
+# --- Retrieval ---
+EMBEDDING_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+# Stable name: corpus and model changes are picked up through the manifest.
+# Other collections starting with COLLECTION_PREFIX are treated as orphans.
+COLLECTION_NAME = "gita_verses"
+COLLECTION_PREFIX = "gita_"
+# Each verse is embedded once per language: index language tag -> verse field.
+# Changing this triggers a full re-embed.
+INDEX_LANGS = {"en": "english_translation", "kn": "translation", "sa": "text"}
+# Query language -> index languages searched (the Sanskrit text is in Kannada script)
+QUERY_LANG_ROUTES = {"English": ("en",), "Kannada": ("kn", "sa")}
+# Search every language and keep each verse's best score, instead of routing
+FUSE_ALL_LANGUAGES = False
+
+# BM25 index over the verse fields, fused with dense results by reciprocal rank
+LEXICAL_SEARCH = True
+HYBRID_CANDIDATES = 20  # Verses taken from each of the dense and lexical rankings
+RRF_K = 60
+# Short queries whose words are all rare skip embedding and use the lexical matches
+LEXICAL_FAST_PATH_MAX_TOKENS = 2
+LEXICAL_FAST_PATH_MAX_DF = 0.05  # Max share of verses a word may appear in
+RELEVANCE_THRESHOLD = 0.3
+TOP_K = 3
+MAX_K = 50  # Largest k a search request may ask for
+
+# Second stage: rerank a wider first-stage pool with a multilingual cross-encoder
+RERANK = os.environ.get("GITA_RERANK", "0") == "1"
+RERANK_MODEL_NAME = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+RERANK_CANDIDATES = 30  # Verses retrieved per query before reranking
+# Per-query latency budget, n of them for a batch of n queries; a pool whose rerank
+# would exceed it keeps its first-stage order
+RERANK_BUDGET_MS = 150
+RERANK_CACHE_MAX_ENTRIES = 8192  # Cached (query, verse) scores
+INGEST_BATCH_SIZE = 64  # Verses embedded and upserted per chunk
+
+# HNSW index of the Chroma collection; changing any of these rebuilds it on next sync.
+# Pick values with tune_hnsw.py (recall@k vs latency and index size).
+HNSW_SPACE = "cosine"          # "cosine", "ip" or "l2"
+HNSW_CONSTRUCTION_EF = 100     # Candidate list size while building
+HNSW_SEARCH_EF = 100           # Candidate list size while querying
+HNSW_M = 16                    # Graph neighbours per node
+
+# "chroma" (persistent HNSW collection) or "numpy" (exact search over a memory-mapped snapshot)
+RETRIEVAL_BACKEND = os.environ.get("GITA_RETRIEVAL_BACKEND", "chroma")
+NUMPY_INDEX_DIR = os.path.join(os.getcwd(), "numpy_index")
+NUMPY_INDEX_DTYPE = "float32"  # "float16" halves the snapshot size
+
+# "torch" (sentence-transformers), "onnx" (onnxruntime) or "onnx-int8" (dynamically quantized)
+EMBEDDING_BACKEND = os.environ.get("GITA_EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.path.join(os.getcwd(), "onnx_model")
+# onnxruntime thread pools; 0 lets onnxruntime pick (one per physical core)
+ONNX_INTRA_OP_THREADS = int(os.environ.get("GITA_ONNX_THREADS", "0"))
+ONNX_INTER_OP_THREADS = 1
+
+# --- Audio generation ---
+# Audio language -> (verse field to read, TTS language codes to try in order)
+AUDIO_LANGS = {
+    "en": ("english_translation", ("en",)),
+    "kn": ("translation", ("kn",)),
+    "sa": ("text", ("hi", "kn")),  # Hindi proxy for Sanskrit, Kannada as fallback
+}
+AUDIO_WORKERS = 4
+AUDIO_RATE_PER_SECOND = 2.0  # Sustained TTS requests per second across all workers
+AUDIO_BURST = 4
+AUDIO_MAX_RETRIES = 3
+AUDIO_JOB_MANIFEST = os.path.join(AUDIO_DIR, "jobs.jsonl")
+# Clips live under {lang}/ch{chapter}/; this chapter's may still be at the older {lang}/verse_{n}.mp3
+AUDIO_LEGACY_CHAPTER = 2
+# Runs in a row a clip may fail before it is no longer attempted (delete its manifest line to retry)
+AUDIO_MAX_FAILED_RUNS = 3
+# Packed archives (one per language) built by audio_pack.py; preferred over loose MP3s
+AUDIO_PACK_DIR = os.path.join(AUDIO_DIR, "packs")
+# Cached expected-vs-present index of clips per (verse, language)
+AUDIO_ASSET_INDEX = os.path.join(AUDIO_DIR, "assets.json")
+# Byte budget of the process-wide clip cache shared by all sessions
+AUDIO_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# --- Text-to-speech ---
+# "gtts" (network, rate limited) or "espeak" (local espeak-ng + ffmpeg, no network)
+TTS_BACKEND = os.environ.get("GITA_TTS_BACKEND", "gtts")
+# TTS language code -> espeak-ng voice
+TTS_ESPEAK_VOICES = {"en": "en", "kn": "kn", "hi": "hi"}
+# Synthesized clips cached by (text hash, lang, backend settings): in memory, and on disk if set
+TTS_CACHE_MAX_BYTES = 16 * 1024 * 1024
+TTS_CACHE_DIR = os.environ.get("GITA_TTS_CACHE_DIR")
+
+# --- Result cache ---
+RESULT_CACHE_MAX_ENTRIES = 1024
+RESULT_CACHE_TTL_SECONDS = 3600
+SAMPLE_QUERIES_PATH = "SAMPLE_QUERIES.md"
+
+# --- Shared embedding server ---
+# Unix socket of embedding_server.py; when set, the app uses it instead of loading the model
+EMBEDDING_SERVER_SOCKET = os.environ.get("GITA_EMBEDDING_SOCKET")
+EMBEDDING_SERVER_POOL_SIZE = 4  # Pooled client connections per process
+
+# --- HTTP service ---
+SERVICE_HOST = os.environ.get("GITA_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("GITA_SERVICE_PORT", "8600"))
+# Micro-batching: queries arriving within BATCH_MAX_WAIT_MS share one encode + search
+BATCH_MAX_SIZE = 32
+BATCH_MAX_WAIT_MS = 5
+
+# --- Instrumentation ---
+METRICS_EVENT_BUFFER = 200  # Recent events kept in memory
+# Periodic snapshot file (Prometheus text if it ends in .prom, else JSON); unset disables it
+METRICS_SNAPSHOT_PATH = os.environ.get("GITA_METRICS_SNAPSHOT")
+METRICS_SNAPSHOT_INTERVAL_SECONDS = 15
+
+# Sample questions shown as buttons in the app (also used to prewarm the cache)
+SAMPLE_QUESTIONS = {
+    'English': [
+        "What is the nature of the soul?",
+        "What is the duty of a Kshatriya?",
+        "How to control senses?",
+        "How to find peace?"
+    ],
+    'Kannada': [
+        "ಆತ್ಮದ ಸ್ವರೂಪವೇನು?",
+        "ಕ್ಷತ್ರಿಯನ ಧರ್ಮವೇನು?",
+        "ಇಂದ್ರಿಯಗಳನ್ನು ನಿಗ್ರಹಿಸುವುದು ಹೇಗೆ?",
+        "ಶಾಂತಿಯನ್ನು ಪಡೆಯುವುದು ಹೇಗೆ?"
+    ]
+}
@@ -0,0 +1,203 @@
+"""
+Selectable embedding backends for the shared model.
+
+All backends expose encode(texts, batch_size) -> L2-normalized float32
+matrix, so query_engine and the ingestion pipeline don't care which one
+runs underneath:
+
+- "torch":     sentence-transformers on PyTorch (reference implementation)
+- "onnx":      the same transformer exported to ONNX, served by onnxruntime
+- "onnx-int8": the ONNX export with dynamically int8-quantized weights
+
+The ONNX variants tokenize with the `tokenizers` library and do mean
+pooling in NumPy, so serving needs neither torch nor transformers. The
+export itself (done once, on first use or via `python embedding_backends.py`)
+still uses torch.
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+from config import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, ONNX_MODEL_DIR,
+    ONNX_INTRA_OP_THREADS, ONNX_INTER_OP_THREADS,
+)
+
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+EXPORT_INFO_FILE = "export.json"
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class TorchEmbedder:
+    """sentence-transformers on PyTorch."""
+
+    name = "torch"
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size=32):
+        return np.asarray(
+            self.model.encode(
+                list(texts),
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            ),
+            dtype=np.float32,
+        )
+
+
+class OnnxEmbedder:
+    """The exported transformer on onnxruntime, with NumPy mean pooling."""
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=False,
+                 intra_op_threads=ONNX_INTRA_OP_THREADS, inter_op_threads=ONNX_INTER_OP_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.name = "onnx-int8" if quantized else "onnx"
+        with open(os.path.join(model_dir, EXPORT_INFO_FILE), 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        self.max_seq_length = info['max_seq_length']
+        self.dimension = info['dimension']
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=info['pad_token_id'], pad_token=info['pad_token'])
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+        model_file = ONNX_INT8_FILE if quantized else ONNX_FILE
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"]
+        )
+
+    def encode(self, texts, batch_size=32):
+        texts = list(texts)
+        out = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            (hidden,) = self.session.run(
+                ["last_hidden_state"], {"input_ids": input_ids, "attention_mask": attention_mask}
+            )
+            # Mean pooling over real tokens, as in the sentence-transformers pooling layer
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            out.append(_normalize(pooled))
+        if not out:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.concatenate(out)
+
+
+def export_onnx(model_name=EMBEDDING_MODEL_NAME, model_dir=ONNX_MODEL_DIR, quantize=True):
+    """
+    Exports the transformer behind the sentence-transformers model to ONNX,
+    saves its fast tokenizer, and optionally writes a dynamic int8 variant.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(model_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    class _Wrapper(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    dummy = tokenizer(["export"], return_tensors="pt")
+    torch.onnx.export(
+        _Wrapper(transformer),
+        (dummy["input_ids"], dummy["attention_mask"]),
+        os.path.join(model_dir, ONNX_FILE),
+        input_names=["input_ids", "attention_mask"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"},
+        },
+        opset_version=17,
+    )
+    tokenizer.backend_tokenizer.save(os.path.join(model_dir, TOKENIZER_FILE))
+    with open(os.path.join(model_dir, EXPORT_INFO_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            "model": model_name,
+            "max_seq_length": st_model.max_seq_length,
+            "dimension": st_model.get_sentence_embedding_dimension(),
+            "pad_token": tokenizer.pad_token,
+            "pad_token_id": tokenizer.pad_token_id,
+        }, f, indent=1)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(
+            os.path.join(model_dir, ONNX_FILE),
+            os.path.join(model_dir, ONNX_INT8_FILE),
+            weight_type=QuantType.QInt8,
+        )
+
+
+def _export_matches(model_dir, model_name, quantized):
+    try:
+        with open(os.path.join(model_dir, EXPORT_INFO_FILE), 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    model_file = ONNX_INT8_FILE if quantized else ONNX_FILE
+    return info.get("model") == model_name and os.path.exists(os.path.join(model_dir, model_file))
+
+
+def import_runtime(kind=EMBEDDING_BACKEND):
+    """Imports the heavy runtime behind a backend (for startup profiling)."""
+    if kind == "torch":
+        import sentence_transformers  # noqa: F401  (pulls in torch)
+    else:
+        import onnxruntime  # noqa: F401
+        import tokenizers  # noqa: F401
+
+
+def create_embedder(kind=EMBEDDING_BACKEND, model_name=EMBEDDING_MODEL_NAME, model_dir=ONNX_MODEL_DIR):
+    """Builds the configured embedder, exporting the ONNX model on first use."""
+    if kind == "torch":
+        return TorchEmbedder(model_name)
+    if kind in ("onnx", "onnx-int8"):
+        quantized = kind == "onnx-int8"
+        if not _export_matches(model_dir, model_name, quantized):
+            print(f"Exporting {model_name} to ONNX in {model_dir}...")
+            export_onnx(model_name, model_dir, quantize=quantized)
+        return OnnxEmbedder(model_dir, quantized=quantized)
+    raise ValueError(f"Unknown embedding backend: {kind!r} (expected one of {', '.join(BACKENDS)})")
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else ONNX_MODEL_DIR
+    export_onnx(EMBEDDING_MODEL_NAME, target, quantize=True)
+    print(f"Exported {EMBEDDING_MODEL_NAME} to {target} ({ONNX_FILE}, {ONNX_INT8_FILE})")
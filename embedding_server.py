@@ -0,0 +1,287 @@
+"""
+Shared embedding and retrieval server over a Unix domain socket.
+
+Several app worker processes can share one copy of the model and the index:
+each worker talks to this server instead of loading them in-process (set
+GITA_EMBEDDING_SOCKET for the app). Requests and responses use a compact
+little-endian binary protocol; clients keep a small pool of connections.
+
+Request:   "<BBHHI"  op, language, k, item count, payload length
+           payload:  count x ("<I" length + UTF-8 text)
+Response:  "<BBHI"   status, reserved, item count, payload length
+           OP_EMBED:  "<I" dimension + count x dimension float32
+           OP_SEARCH: count x result, where result is
+                      "<BfH" source length, context precision, hits,
+                      the source (UTF-8), then per hit
+                      "<fI" score, verse id length + verse id (UTF-8);
+                      clients fill in the verses from their own verse store
+           OP_PING:   UTF-8 index version
+           errors:    UTF-8 message (status STATUS_ERROR)
+
+Usage:
+    python embedding_server.py                # serves on EMBEDDING_SERVER_SOCKET
+    python embedding_server.py /tmp/gita.sock
+"""
+
+import errno
+import os
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+
+import numpy as np
+
+from config import (
+    RETRIEVAL_BACKEND, TOP_K, EMBEDDING_SERVER_SOCKET, EMBEDDING_SERVER_POOL_SIZE,
+)
+from retrieval_backends import RetrievalBackend
+from verse_store import get_store
+
+REQUEST = struct.Struct("<BBHHI")
+RESPONSE = struct.Struct("<BBHI")
+LENGTH = struct.Struct("<I")
+RESULT = struct.Struct("<BfH")
+HIT = struct.Struct("<fI")
+
+OP_EMBED, OP_SEARCH, OP_PING = 1, 2, 3
+STATUS_OK, STATUS_ERROR = 0, 1
+LANGS = (None, "English", "Kannada")
+
+
+class ServerError(Exception):
+    """Raised by the client when the server reports a failure."""
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("connection closed by peer")
+        received += n
+    return bytes(buffer)
+
+
+def encode_texts(texts):
+    parts = []
+    for text in texts:
+        data = text.encode('utf-8')
+        parts.append(LENGTH.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def decode_texts(payload, count):
+    texts, offset = [], 0
+    for _ in range(count):
+        (length,) = LENGTH.unpack_from(payload, offset)
+        offset += LENGTH.size
+        texts.append(payload[offset:offset + length].decode('utf-8'))
+        offset += length
+    return texts
+
+
+def encode_results(results):
+    parts = []
+    for result in results:
+        source = result.source.encode('utf-8')
+        parts.append(RESULT.pack(len(source), result.context_precision, len(result.ids)))
+        parts.append(source)
+        for verse_id, score in zip(result.ids, result.scores):
+            data = verse_id.encode('utf-8')
+            parts.append(HIT.pack(float(score), len(data)))
+            parts.append(data)
+    return b"".join(parts)
+
+
+def decode_results(payload, count, store):
+    import query_engine
+
+    results, offset = [], 0
+    for _ in range(count):
+        source_length, precision, hits = RESULT.unpack_from(payload, offset)
+        offset += RESULT.size
+        source = payload[offset:offset + source_length].decode('utf-8')
+        offset += source_length
+        ids, scores = [], []
+        for _ in range(hits):
+            score, length = HIT.unpack_from(payload, offset)
+            offset += HIT.size
+            ids.append(payload[offset:offset + length].decode('utf-8'))
+            offset += length
+            scores.append(score)
+        ids, metadatas, scores = query_engine.hydrate(store, ids, scores)
+        results.append(query_engine.SearchResult(
+            ids=ids,
+            metadatas=metadatas,
+            scores=np.asarray(scores, dtype=np.float32),
+            context_precision=precision,
+            source=source,
+        ))
+    return results
+
+
+# --- Server ---
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                op, lang, k, count, length = REQUEST.unpack(_recv_exact(self.request, REQUEST.size))
+                payload = _recv_exact(self.request, length)
+            except ConnectionError:
+                return
+            try:
+                count, body = self.server.dispatch(op, LANGS[lang], k, decode_texts(payload, count))
+                status = STATUS_OK
+            except Exception as e:
+                count, body, status = 0, str(e).encode('utf-8'), STATUS_ERROR
+            self.request.sendall(RESPONSE.pack(status, 0, count, len(body)) + body)
+
+
+def remove_stale_socket(socket_path):
+    """
+    Deletes a socket file left behind by a server that is gone. Raises
+    OSError if a live server still accepts connections on it.
+    """
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except FileNotFoundError:
+        return
+    except ConnectionRefusedError:
+        os.unlink(socket_path)
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, f"an embedding server is already listening on {socket_path}")
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves one in-process model and retrieval backend to many clients."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, backend, version):
+        import query_engine
+
+        self.query_engine = query_engine
+        self.backend = backend
+        self.version = version
+        # One request at a time reaches the model; batching happens per request
+        self._lock = threading.Lock()
+        remove_stale_socket(socket_path)
+        super().__init__(socket_path, _Handler)
+
+    def dispatch(self, op, lang, k, texts):
+        if op == OP_PING:
+            return 0, self.version.encode('utf-8')
+        with self._lock:
+            if op == OP_EMBED:
+                vectors = self.query_engine.embed(texts)
+                dimension = vectors.shape[1] if vectors.ndim == 2 else 0
+                return len(texts), LENGTH.pack(dimension) + np.ascontiguousarray(vectors, dtype='<f4').tobytes()
+            if op == OP_SEARCH:
+                results = self.query_engine.search_batch(self.backend, texts, k=k, lang=lang)
+                return len(results), encode_results(results)
+        raise ValueError(f"unknown op {op}")
+
+
+# --- Client ---
+
+class EmbeddingClient:
+    """Thread-safe client with a pool of persistent connections."""
+
+    def __init__(self, socket_path=EMBEDDING_SERVER_SOCKET, pool_size=EMBEDDING_SERVER_POOL_SIZE, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _request(self, op, texts=(), lang=None, k=0):
+        try:
+            sock = self._pool.get_nowait()
+        except queue.Empty:
+            sock = self._connect()
+        payload = encode_texts(texts)
+        try:
+            sock.sendall(REQUEST.pack(op, LANGS.index(lang), k, len(texts), len(payload)) + payload)
+            status, _, count, length = RESPONSE.unpack(_recv_exact(sock, RESPONSE.size))
+            body = _recv_exact(sock, length)
+        except Exception:
+            sock.close()  # The stream may be mid-message: never reuse it
+            raise
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+        if status != STATUS_OK:
+            raise ServerError(body.decode('utf-8', 'replace'))
+        return count, body
+
+    def ping(self):
+        """The server's index version."""
+        return self._request(OP_PING)[1].decode('utf-8')
+
+    def embed(self, texts):
+        count, body = self._request(OP_EMBED, list(texts))
+        (dimension,) = LENGTH.unpack_from(body)
+        return np.frombuffer(body, dtype='<f4', offset=LENGTH.size).reshape(count, dimension)
+
+    def search_batch(self, queries, k=TOP_K, lang=None, store=None):
+        count, body = self._request(OP_SEARCH, list(queries), lang=lang, k=k)
+        return decode_results(body, count, store if store is not None else get_store())
+
+
+class RemoteBackend(RetrievalBackend):
+    """
+    Backend whose queries are embedded and searched by the shared server;
+    query_engine.search_batch() hands whole query batches to it.
+    """
+
+    embeds_queries = True
+
+    def __init__(self, client, version, store=None):
+        self.client = client
+        self.name = version.split(":", 1)[0]
+        self.version = version
+        self.store = store if store is not None else get_store()
+
+    def search_queries(self, queries, k, lang=None):
+        return self.client.search_batch(queries, k=k, lang=lang, store=self.store)
+
+
+def main():
+    import startup
+
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else EMBEDDING_SERVER_SOCKET
+    if not socket_path:
+        sys.exit("Set GITA_EMBEDDING_SOCKET or pass a socket path.")
+    try:
+        remove_stale_socket(socket_path)  # Before the warm-up, which is the slow part
+    except OSError as e:
+        sys.exit(str(e))
+    warmup = startup.Warmup(RETRIEVAL_BACKEND).start()
+    if not warmup.wait():
+        sys.exit(f"Warm-up failed: {warmup.error}")
+    server = EmbeddingServer(socket_path, warmup.backend, warmup.version)
+    print(f"Serving {warmup.version} on {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    main()
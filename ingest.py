@@ -0,0 +1,261 @@
+"""
+Streaming ingestion pipeline for the verse corpus.
+
+Verses are streamed from one or many chapter JSON files with a generator,
+embedded in fixed-size batches on the shared model and upserted into the
+collection chunk by chunk, so peak memory stays flat however large the
+corpus grows and re-running the pipeline is idempotent.
+
+Each verse is embedded once per language field (see INDEX_LANGS), as
+separate vectors tagged with their language, so no language is truncated
+out of a mixed document and queries can search only the matching language.
+
+Verses are read through verse_store; the index itself only keeps ids and
+the filter fields in METADATA_FIELDS.
+
+A manifest next to the database records the model, the indexed languages
+and a content hash per verse. sync_index() diffs the corpus against it and
+only re-embeds, upserts or deletes the verses that actually changed.
+
+Usage:
+    python ingest.py                      # sync the files in CORPUS_FILES
+    python ingest.py chapters/*.json      # sync specific files
+"""
+
+import hashlib
+import json
+import os
+import sys
+from itertools import islice
+
+from config import (
+    CORPUS_FILES, INGEST_BATCH_SIZE, COLLECTION_NAME, COLLECTION_PREFIX,
+    DB_PATH, MANIFEST_PATH, EMBEDDING_MODEL_NAME, INDEX_LANGS,
+)
+from verse_store import expand_paths, iter_verses, verse_id
+
+# The only metadata kept in the index; verse text is served from the verse store
+METADATA_FIELDS = ("verse_id", "chapter", "verse", "lang")
+
+
+def vector_id(vid, lang):
+    return f"{vid}:{lang}"
+
+
+def build_document(verse, lang):
+    """
+    Chunking Strategy:
+    Since each verse is a distinct, self-contained semantic unit, we treat each verse as a single chunk,
+    embedded separately per language (English, Kannada, Sanskrit) so each fits the model's token window.
+    """
+    return verse[INDEX_LANGS[lang]]
+
+
+def build_metadata(verse, lang=None):
+    metadata = {
+        "verse_id": verse_id(verse),
+        "chapter": verse['chapter'],
+        "verse": verse['verse'],
+    }
+    if lang is not None:
+        metadata["lang"] = lang
+    return metadata
+
+
+def batched(iterable, size):
+    """Yields lists of up to `size` items from an iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ingest(collection, verses, batch_size=INGEST_BATCH_SIZE, on_progress=None):
+    """
+    Embeds and upserts verses in batches of `batch_size`, one vector per
+    verse and language. Calls on_progress(verses_indexed_so_far) after every
+    batch. Returns the number of verses indexed.
+    """
+    import query_engine
+
+    indexed = 0
+    for batch in batched(verses, batch_size):
+        pairs = [(v, lang) for v in batch for lang in INDEX_LANGS]
+        documents = [build_document(v, lang) for v, lang in pairs]
+        # Only ids and filter fields are stored; the text stays in the verse store
+        collection.upsert(
+            ids=[vector_id(verse_id(v), lang) for v, lang in pairs],
+            embeddings=query_engine.embed(documents, batch_size=batch_size),
+            metadatas=[build_metadata(v, lang) for v, lang in pairs],
+        )
+        indexed += len(batch)
+        if on_progress:
+            on_progress(indexed)
+    return indexed
+
+
+# --- Manifest ---
+
+def content_hash(verse):
+    """Hash of everything that ends up in the index for one verse."""
+    payload = json.dumps(
+        [[build_document(verse, lang) for lang in INDEX_LANGS], build_metadata(verse)],
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Writes the manifest atomically (temp file + rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def manifest_version(hashes):
+    """Digest of the whole indexed corpus; changes whenever any verse changes."""
+    digest = hashlib.sha256()
+    for key in sorted(hashes):
+        digest.update(f"{key}:{hashes[key]}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def manifest_compatible(manifest):
+    """
+    True if the manifest describes vectors built the way the config asks for.
+    HNSW settings are not compared: a different graph is rebuilt from the
+    stored vectors (see rebuild_graph), nothing needs re-embedding.
+    """
+    return (
+        manifest is not None
+        and manifest.get('collection') == COLLECTION_NAME
+        and manifest.get('model') == EMBEDDING_MODEL_NAME
+        and manifest.get('index_langs') == INDEX_LANGS
+        and manifest.get('metadata_fields') == list(METADATA_FIELDS)
+    )
+
+
+def rebuild_graph(client, collection, batch_size=INGEST_BATCH_SIZE):
+    """
+    Recreates the collection with the configured HNSW settings from its own
+    stored vectors and metadata. Returns the new collection.
+    """
+    import query_engine
+
+    total = collection.count()
+    pages = [
+        collection.get(include=['embeddings', 'metadatas'], limit=batch_size, offset=offset)
+        for offset in range(0, total, batch_size)
+    ]
+    client.delete_collection(collection.name)
+    collection = query_engine.get_collection(client, collection.name)
+    for page in pages:
+        if page['ids']:
+            collection.add(ids=page['ids'], embeddings=page['embeddings'], metadatas=page['metadatas'])
+    return collection
+
+
+def collect_orphans(client, keep=COLLECTION_NAME, prefix=COLLECTION_PREFIX):
+    """Deletes collections left behind by older index layouts. Returns their names."""
+    removed = []
+    for entry in client.list_collections():
+        name = getattr(entry, 'name', entry)  # Collection objects or plain names, depending on version
+        if name != keep and name.startswith(prefix):
+            client.delete_collection(name)
+            removed.append(name)
+    return removed
+
+
+def sync_index(client, paths, batch_size=INGEST_BATCH_SIZE, on_progress=None):
+    """
+    Brings the collection in line with the corpus, touching only what changed.
+
+    A different model, set of indexed languages or metadata layout
+    invalidates the index, so the collection is rebuilt from scratch; new
+    HNSW settings only rebuild the graph from the stored vectors. Otherwise
+    only verses whose content hash differs from the manifest are
+    re-embedded, and verses that vanished from the corpus are deleted.
+    Returns (collection, stats).
+    """
+    import query_engine
+
+    manifest = load_manifest()
+    old_hashes = manifest['hashes'] if manifest_compatible(manifest) else {}
+
+    collection = query_engine.get_collection(client, COLLECTION_NAME)
+    if collection.count() != len(old_hashes) * len(INDEX_LANGS):
+        # Manifest and database disagree (or are incompatible): start clean
+        client.delete_collection(COLLECTION_NAME)
+        collection = query_engine.get_collection(client, COLLECTION_NAME)
+        old_hashes = {}
+    elif old_hashes and manifest.get('hnsw') != query_engine.COLLECTION_METADATA:
+        collection = rebuild_graph(client, collection, batch_size=batch_size)
+
+    new_hashes = {}
+
+    def changed_verses():
+        for verse in iter_verses(paths):
+            vid = verse_id(verse)
+            new_hashes[vid] = content_hash(verse)
+            if old_hashes.get(vid) != new_hashes[vid]:
+                yield verse
+
+    upserted = ingest(collection, changed_verses(), batch_size=batch_size, on_progress=on_progress)
+
+    deleted = [vid for vid in old_hashes if vid not in new_hashes]
+    for chunk in batched(deleted, batch_size):
+        collection.delete(ids=[vector_id(vid, lang) for vid in chunk for lang in INDEX_LANGS])
+
+    version = manifest_version(new_hashes)
+    save_manifest({
+        'collection': COLLECTION_NAME,
+        'model': EMBEDDING_MODEL_NAME,
+        'index_langs': INDEX_LANGS,
+        'metadata_fields': list(METADATA_FIELDS),
+        'hnsw': query_engine.COLLECTION_METADATA,
+        'version': version,
+        'hashes': new_hashes,
+    })
+    orphans = collect_orphans(client)
+
+    stats = {
+        'total': len(new_hashes),
+        'upserted': upserted,
+        'deleted': len(deleted),
+        'orphans_removed': orphans,
+        'version': version,
+    }
+    return collection, stats
+
+
+def main():
+    import chromadb
+
+    paths = expand_paths(sys.argv[1:] or CORPUS_FILES)
+    client = chromadb.PersistentClient(path=DB_PATH)
+
+    print(f"Syncing {len(paths)} file(s) into '{COLLECTION_NAME}' at {DB_PATH}")
+    collection, stats = sync_index(
+        client,
+        paths,
+        on_progress=lambda n: print(f"  {n} verses re-embedded", end="\r"),
+    )
+    print(f"\nDone. {stats['upserted']} upserted, {stats['deleted']} deleted, "
+          f"{len(stats['orphans_removed'])} orphaned collection(s) removed; "
+          f"collection now holds {collection.count()} vectors (version {stats['version']}).")
+
+
+if __name__ == "__main__":
+    main()
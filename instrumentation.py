@@ -0,0 +1,176 @@
+"""
+Hot-path instrumentation with constant memory.
+
+- span(name): times a block and records it in that stage's histogram
+- Histogram: fixed log-spaced buckets, so memory never grows with traffic
+- event(): appends to a bounded ring buffer of recent events
+- snapshot() / to_prometheus(): JSON-ready dict or Prometheus text format,
+  optionally written to a file periodically by start_exporter()
+
+A single process-wide `metrics` registry is shared by the app, the query
+engine, the audio stack and the scripts.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import METRICS_EVENT_BUFFER, METRICS_SNAPSHOT_PATH, METRICS_SNAPSHOT_INTERVAL_SECONDS
+
+# Upper bounds in seconds: 0.1 ms .. ~105 s, doubling (plus +Inf)
+DEFAULT_BUCKETS = tuple(0.0001 * 2 ** i for i in range(21))
+
+
+class Histogram:
+    """Latency histogram with fixed buckets; percentiles are bucket upper bounds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Metrics:
+    """Thread-safe registry of stage histograms, counters and recent events."""
+
+    def __init__(self, event_buffer=METRICS_EVENT_BUFFER):
+        self.histograms = {}
+        self.counters = {}
+        self.events = deque(maxlen=event_buffer)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **fields):
+        """Times the block into histogram `name`; failures are counted and logged."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.incr(f"{name}_errors")
+            self.event(f"{name} failed: {e}", **fields)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def event(self, message, **fields):
+        with self._lock:
+            self.events.append((time.time(), message, fields))
+
+    def recent_events(self, limit=None):
+        with self._lock:
+            events = list(self.events)
+        return events[-limit:] if limit else events
+
+    def clear_events(self):
+        with self._lock:
+            self.events.clear()
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.events.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "stages": {name: h.summary() for name, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def to_prometheus(self, prefix="gita"):
+        """Prometheus text exposition format (histograms in seconds, cumulative buckets)."""
+        lines = [f"# TYPE {prefix}_stage_seconds histogram"]
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {h.sum:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {h.count}')
+            if self.counters:
+                lines.append(f"# TYPE {prefix}_events_total counter")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'{prefix}_events_total{{name="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path):
+        """Writes the snapshot atomically; Prometheus text for *.prom, else JSON."""
+        payload = self.to_prometheus() if path.endswith(".prom") else json.dumps(self.snapshot(), indent=1)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+
+metrics = Metrics()
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(path=METRICS_SNAPSHOT_PATH, interval=METRICS_SNAPSHOT_INTERVAL_SECONDS):
+    """Writes a snapshot every `interval` seconds on a daemon thread (once per process)."""
+    global _exporter
+    if not path:
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            def loop():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        metrics.write_snapshot(path)
+                    except OSError as e:
+                        metrics.event(f"Metrics snapshot failed: {e}")
+
+            _exporter = threading.Thread(target=loop, name="metrics-exporter", daemon=True)
+            _exporter.start()
+    return _exporter
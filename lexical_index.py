@@ -0,0 +1,150 @@
+"""
+In-memory lexical index and verse-reference parser.
+
+Complements dense retrieval for queries a token lookup answers faster and
+more precisely than the transformer: verse references ("2.47", "verse 20",
+"chapter 2 verse 47") and exact words such as "Kshatriya" or "ಸ್ಥಿತಪ್ರಜ್ಞ".
+
+- parse_verse_reference() recognizes references without any embedding.
+- LexicalIndex is a BM25 inverted index over the text, translation and
+  english_translation fields of every verse. Tokenization keeps Kannada
+  vowel signs and viramas inside words (Python's \\w alone splits on them).
+- rrf_fuse() merges ranked lists by reciprocal-rank fusion.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+LEXICAL_FIELDS = ("text", "translation", "english_translation")
+
+_TOKEN = re.compile(r"[\w\u0c80-\u0cff]+")
+_REFERENCE_PATTERNS = (
+    # "2.47", "2:47", "BG 2.47", "gita 2.47"
+    re.compile(r"^(?:bg|gita)?\s*(?P<chapter>\d{1,2})\s*[.:]\s*(?P<verse>\d{1,3})$"),
+    # "chapter 2 verse 47", "ch 2 v 47"
+    re.compile(r"^(?:chapter|ch)\.?\s*(?P<chapter>\d{1,2})\s*,?\s*(?:verse|v|shloka|sloka)\.?\s*(?P<verse>\d{1,3})$"),
+    # "verse 20", "shloka 20", "ಶ್ಲೋಕ 20"
+    re.compile(r"^(?:verse|v|shloka|sloka|ಶ್ಲೋಕ)\.?\s*(?P<verse>\d{1,3})$"),
+)
+
+
+def tokenize(text):
+    """NFC-normalized, case-folded word tokens; Kannada clusters stay whole."""
+    return _TOKEN.findall(unicodedata.normalize("NFC", text).casefold())
+
+
+def parse_verse_reference(query):
+    """Returns (chapter or None, verse) if the query is a verse reference, else None."""
+    text = unicodedata.normalize("NFC", query).strip().casefold()
+    for pattern in _REFERENCE_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            chapter = match.groupdict().get("chapter")
+            return (int(chapter) if chapter else None, int(match.group("verse")))
+    return None
+
+
+def rrf_fuse(rankings, k=60):
+    """
+    Reciprocal-rank fusion of ranked id lists: score(id) = sum 1 / (k + rank).
+    Returns ids ordered by fused score.
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] += 1.0 / (k + rank)
+    return sorted(fused, key=lambda item: -fused[item])
+
+
+class LexicalIndex:
+    """BM25 inverted index over verse records, keyed by verse id."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.verse_ids = []
+        self.metadatas = []
+        self.postings = {}     # token -> list of (doc, term frequency)
+        self.doc_lengths = []
+        self.avg_length = 0.0
+        self.references = {}   # (chapter, verse) -> doc
+        self.by_verse = defaultdict(list)  # verse number -> docs, for chapter-less references
+
+    @classmethod
+    def build(cls, metadatas, **kwargs):
+        """Indexes one record (Verse or dict) per verse (duplicate verse ids are skipped)."""
+        index = cls(**kwargs)
+        postings = defaultdict(list)
+        for metadata in metadatas:
+            vid = metadata.get("verse_id") or f"ch{metadata['chapter']}_v{metadata['verse']}"
+            key = (metadata.get("chapter"), metadata.get("verse"))
+            if key in index.references:
+                continue
+            doc = len(index.verse_ids)
+            index.verse_ids.append(vid)
+            index.metadatas.append(metadata)
+            index.references[key] = doc
+            index.by_verse[metadata.get("verse")].append(doc)
+            counts = Counter(
+                token for field in LEXICAL_FIELDS for token in tokenize(metadata.get(field) or "")
+            )
+            index.doc_lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                postings[token].append((doc, tf))
+        index.postings = dict(postings)
+        if index.doc_lengths:
+            index.avg_length = sum(index.doc_lengths) / len(index.doc_lengths)
+        return index
+
+    def __len__(self):
+        return len(self.verse_ids)
+
+    def document_frequency(self, token):
+        return len(self.postings.get(token, ()))
+
+    def idf(self, token):
+        n = len(self.verse_ids)
+        df = self.document_frequency(token)
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def lookup(self, chapter, verse):
+        """Docs for a verse reference; without a chapter, that verse in every chapter."""
+        if chapter is None:
+            return list(self.by_verse.get(verse, ()))
+        doc = self.references.get((chapter, verse))
+        return [] if doc is None else [doc]
+
+    def search(self, query, k):
+        """Top-k (doc, BM25 score) for the query's tokens."""
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            entries = self.postings.get(token)
+            if not entries:
+                continue
+            idf = self.idf(token)
+            for doc, tf in entries:
+                norm = self.k1 * (1.0 - self.b + self.b * self.doc_lengths[doc] / self.avg_length)
+                scores[doc] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+    def exact_matches(self, query, max_tokens, max_df_ratio):
+        """
+        Docs containing every query token, ranked by BM25, if the query is
+        short and all its tokens are rare enough to be decisive; otherwise None.
+        """
+        tokens = set(tokenize(query))
+        if not tokens or len(tokens) > max_tokens:
+            return None
+        max_df = max(1, int(max_df_ratio * len(self.verse_ids)))
+        docs = None
+        for token in tokens:
+            df = self.document_frequency(token)
+            if df == 0 or df > max_df:
+                return None
+            matched = {doc for doc, _ in self.postings[token]}
+            docs = matched if docs is None else docs & matched
+        if not docs:
+            return None
+        return [doc for doc, _ in self.search(query, len(self.verse_ids)) if doc in docs]
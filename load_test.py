@@ -0,0 +1,259 @@
+"""
+Multi-session load test of the Streamlit app.
+
+Drives N sessions of app.py with Streamlit's AppTest (no browser). AppTest
+installs a process-global mock runtime for every script run, so sessions
+cannot share a process: each one runs in a fresh worker process, at most
+--concurrency at a time. A worker first warms up the app (model, index,
+cache prewarm), then runs the scripted flow:
+
+    load -> sample question -> play audio -> type a query -> play audio
+         -> switch language -> sample question -> clear
+
+With GITA_EMBEDDING_SOCKET set, every worker uses the shared embedding
+server, as the workers of a multi-process deployment would; otherwise each
+worker loads its own model.
+
+Reports:
+  - per-interaction latency percentiles (one script rerun per interaction)
+  - RSS growth of a worker over its session, after warm-up
+  - pickled size of each session's session_state
+  - result cache and audio store hit rates, plus the stage timings and
+    counters collected by instrumentation during the flows
+
+Usage:
+    python load_test.py                         # 10 sessions, 4 at a time
+    python load_test.py --sessions 50 --concurrency 8 --output load_results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import pickle
+import random
+import time
+
+from benchmark import current_rss_mb, summarize
+from config import SAMPLE_QUESTIONS
+
+APP_PATH = "app.py"
+WARMUP_MESSAGE = "⏳"
+
+TYPED_QUERIES = {
+    'English': ["What happens to the soul after death?", "Why should one act without attachment?", "2.47"],
+    'Kannada': ["ಸ್ಥಿತಪ್ರಜ್ಞನ ಲಕ್ಷಣಗಳೇನು?", "ಕರ್ಮಯೋಗ ಎಂದರೇನು?"],
+}
+
+
+def new_session(timeout):
+    from streamlit.testing.v1 import AppTest
+
+    return AppTest.from_file(APP_PATH, default_timeout=timeout)
+
+
+def warming_up(at):
+    return any(WARMUP_MESSAGE in info.value for info in at.info)
+
+
+def wait_until_ready(timeout):
+    """Runs a throwaway session until the background warm-up finishes, so the flow measures serving only."""
+    at = new_session(timeout)
+    deadline = time.monotonic() + timeout
+    at.run()
+    while warming_up(at):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"App not ready after {timeout}s")
+        time.sleep(0.5)
+        at.run()
+    if at.exception:
+        raise RuntimeError(f"App raised during warm-up: {at.exception[0].value}")
+
+
+def find_button(at, label=None, key=None):
+    for button in at.button:
+        if (key is not None and button.key == key) or (label is not None and button.label == label):
+            return button
+    return None
+
+
+def session_state_bytes(at):
+    """Pickled size of a session's state; values that cannot be pickled are counted as 0."""
+    total = 0
+    for key, value in at.session_state.filtered_state.items():
+        try:
+            total += len(pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            pass
+    return total
+
+
+class SessionFlow:
+    """One simulated user: a scripted sequence of interactions, each timed."""
+
+    def __init__(self, index, timeout):
+        self.rng = random.Random(index)
+        self.at = new_session(timeout)
+        self.lang = 'English'
+        self.timings = []  # (interaction, seconds)
+        self.skipped = []
+        self.errors = []
+
+    def _step(self, name, action):
+        """Applies an interaction (None if it is unavailable on the page) and times the rerun."""
+        element = action()
+        if element is None:
+            self.skipped.append(name)
+            return
+        start = time.perf_counter()
+        element.run()
+        self.timings.append((name, time.perf_counter() - start))
+        if self.at.exception:
+            self.errors.append(f"{name}: {self.at.exception[0].value}")
+
+    def sample_question(self):
+        question = self.rng.choice(SAMPLE_QUESTIONS[self.lang])
+        button = find_button(self.at, label=question)
+        return button.click() if button is not None else None
+
+    def type_query(self):
+        return self.at.text_input(key="query_input").input(self.rng.choice(TYPED_QUERIES[self.lang]))
+
+    def play_audio(self):
+        button = find_button(self.at, key="play_audio_0")
+        return button.click() if button is not None else None
+
+    def switch_language(self):
+        self.lang = 'Kannada' if self.lang == 'English' else 'English'
+        return self.at.radio[0].set_value(self.lang)
+
+    def clear(self):
+        button = find_button(self.at, key="clear_query_btn")
+        return button.click() if button is not None else None
+
+    def run(self):
+        self._step("load", lambda: self.at)
+        self._step("sample_question", self.sample_question)
+        self._step("play_audio", self.play_audio)
+        self._step("type_query", self.type_query)
+        self._step("play_audio", self.play_audio)
+        self._step("switch_language", self.switch_language)
+        self._step("sample_question", self.sample_question)
+        self._step("clear", self.clear)
+        return self
+
+
+def run_session(index, timeout):
+    """Worker entry point: warms up, runs one session and returns its measurements."""
+    import query_engine
+    from instrumentation import metrics
+
+    wait_until_ready(timeout)
+    metrics.reset()
+    cache_before = query_engine.result_cache.stats()
+    rss_before = current_rss_mb()
+
+    flow = SessionFlow(index, timeout).run()
+
+    cache_after = query_engine.result_cache.stats()
+    return {
+        "timings": flow.timings,
+        "skipped": flow.skipped,
+        "errors": flow.errors,
+        "rss_growth_mb": current_rss_mb() - rss_before if rss_before is not None else None,
+        "session_state_bytes": session_state_bytes(flow.at),
+        "result_cache_hits": cache_after["hits"] - cache_before["hits"],
+        "result_cache_misses": cache_after["misses"] - cache_before["misses"],
+        "metrics": metrics.snapshot(),
+    }
+
+
+def merge_metrics(snapshots):
+    """Summed counters and per-stage call counts across workers."""
+    counters, calls = {}, {}
+    for snapshot in snapshots:
+        for name, value in snapshot["counters"].items():
+            counters[name] = counters.get(name, 0) + value
+        for name, stage in snapshot["stages"].items():
+            calls[name] = calls.get(name, 0) + stage["n"]
+    return counters, calls
+
+
+def distribution(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        "min": round(values[0], 3),
+        "median": round(values[len(values) // 2], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent app sessions and report latency and memory.")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4, help="Session processes run at once")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds allowed per script run")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    print(f"Running {args.sessions} sessions, {args.concurrency} worker processes at a time...")
+    start = time.perf_counter()
+    # A fresh process per session: AppTest's mock runtime is process-global
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.concurrency, maxtasksperchild=1) as pool:
+        sessions = pool.starmap(run_session, [(i, args.timeout) for i in range(args.sessions)])
+    elapsed = time.perf_counter() - start
+
+    by_interaction = {}
+    for session in sessions:
+        for name, seconds in session["timings"]:
+            by_interaction.setdefault(name, []).append(seconds)
+    interactions = {name: summarize(samples) for name, samples in by_interaction.items()}
+
+    hits = sum(s["result_cache_hits"] for s in sessions)
+    lookups = hits + sum(s["result_cache_misses"] for s in sessions)
+    counters, calls = merge_metrics(s["metrics"] for s in sessions)
+    # audio_read only runs on an audio store miss
+    audio_lookups = calls.get("audio_lookup", 0)
+    report = {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "elapsed_s": elapsed,
+        "interactions": interactions,
+        "rss_growth_mb": distribution([s["rss_growth_mb"] for s in sessions if s["rss_growth_mb"] is not None]),
+        "session_state_bytes": distribution([s["session_state_bytes"] for s in sessions]),
+        "result_cache_hit_rate": hits / lookups if lookups else None,
+        "audio_store_hit_rate": 1.0 - calls.get("audio_read", 0) / audio_lookups if audio_lookups else None,
+        "skipped": sum(len(s["skipped"]) for s in sessions),
+        "errors": [error for s in sessions for error in s["errors"]],
+        "stage_calls": calls,
+        "counters": counters,
+    }
+
+    print(f"\n{args.sessions} sessions ({args.concurrency} concurrent) in {elapsed:.1f}s\n")
+    header = f"{'interaction':<16} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, s in interactions.items():
+        print(f"{name:<16} {s['n']:>5} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['mean_ms']:>9.1f}")
+    rss, state = report["rss_growth_mb"], report["session_state_bytes"]
+    if rss is not None:
+        print(f"\nRSS growth per session (MiB): median {rss['median']}, max {rss['max']}")
+    print(f"Session state (pickled bytes): median {state['median']}, max {state['max']}")
+    for name in ("result_cache_hit_rate", "audio_store_hit_rate"):
+        value = report[name]
+        print(f"{name.replace('_', ' ').capitalize()}: {'n/a' if value is None else f'{value:.1%}'}")
+    if report["skipped"]:
+        print(f"Skipped interactions (element not on the page): {report['skipped']}")
+    for error in report["errors"]:
+        print(f"ERROR {error}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
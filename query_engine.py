@@ -0,0 +1,395 @@
+"""
+Query engine shared by the Streamlit app and the offline scripts.
+
+Keeps a single copy of the embedding model per process, embeds each query
+exactly once and derives the RAG metrics from the distances the vector
+store already returns, instead of re-encoding and re-comparing in Python.
+The index returns ids only; result verses come from the shared verse store.
+
+The index holds one vector per verse and language. Each query is routed to
+the languages matching its script (or the chosen UI language), and verses
+matched in several languages are fused by keeping their best score.
+
+When the backend carries a lexical index, verse references are answered
+from it without embedding, short rare-word queries take its exact matches
+instead of a vector search, and all other queries fuse the dense and BM25
+rankings by reciprocal rank. Every verse found lexically is still scored
+by cosine against the query, so relevance always means the same thing.
+
+With RERANK on, the first stage keeps RERANK_CANDIDATES verses per query and
+a cross-encoder reorders them (see reranker) within RERANK_BUDGET_MS.
+"""
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from config import (
+    EMBEDDING_BACKEND, RELEVANCE_THRESHOLD, TOP_K,
+    INDEX_LANGS, QUERY_LANG_ROUTES, FUSE_ALL_LANGUAGES,
+    HYBRID_CANDIDATES, RRF_K, RERANK, RERANK_CANDIDATES,
+    LEXICAL_FAST_PATH_MAX_TOKENS, LEXICAL_FAST_PATH_MAX_DF,
+    HNSW_SPACE, HNSW_CONSTRUCTION_EF, HNSW_SEARCH_EF, HNSW_M,
+    RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL_SECONDS,
+)
+from instrumentation import metrics
+from lexical_index import parse_verse_reference, rrf_fuse
+from result_cache import ResultCache
+from verse_store import get_store
+
+
+def hnsw_metadata(space=HNSW_SPACE, construction_ef=HNSW_CONSTRUCTION_EF, search_ef=HNSW_SEARCH_EF, m=HNSW_M):
+    """Collection metadata that configures Chroma's HNSW index."""
+    return {
+        "hnsw:space": space,
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": search_ef,
+        "hnsw:M": m,
+    }
+
+
+COLLECTION_METADATA = hnsw_metadata()
+
+_model = None
+_model_lock = threading.Lock()
+
+# Shared by every session in the process
+result_cache = ResultCache(
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+)
+
+
+def get_model():
+    """Returns the process-wide embedder (see embedding_backends), loading it on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from embedding_backends import create_embedder
+                _model = create_embedder(EMBEDDING_BACKEND)
+    return _model
+
+
+def embed(texts, batch_size=32):
+    """Encodes a list of texts into L2-normalized float32 vectors."""
+    with metrics.span("embed"):
+        return get_model().encode(texts, batch_size=batch_size)
+
+
+def get_collection(client, name, metadata=None):
+    """
+    Opens (or creates) a collection with the configured HNSW settings and no
+    embedding function. Embeddings are always supplied by the shared model,
+    so Chroma never loads a second copy of it.
+    """
+    return client.get_or_create_collection(
+        name=name,
+        embedding_function=None,
+        metadata=metadata or COLLECTION_METADATA,
+    )
+
+
+@dataclass
+class SearchResult:
+    """Top-k verses for one query together with their RAG metrics."""
+    ids: list
+    metadatas: list             # Verse records from the verse store
+    scores: np.ndarray          # Answer relevance (cosine similarity) per result, see score_kind
+    context_precision: float    # Share of results above RELEVANCE_THRESHOLD
+    source: str = "dense"       # "dense", "hybrid", "rerank", "lexical" or "reference"
+
+    @property
+    def score_kind(self):
+        """"reference" when scores mark exact verse-reference matches, else "cosine"."""
+        return "reference" if self.source == "reference" else "cosine"
+
+    @property
+    def top_score(self):
+        return float(self.scores[0]) if len(self.scores) else 0.0
+
+    def is_relevant(self, threshold=RELEVANCE_THRESHOLD):
+        if self.score_kind == "reference":
+            return len(self.scores) > 0  # A verse the user asked for by number
+        return self.top_score >= threshold
+
+
+def compute_metrics(distances, threshold=RELEVANCE_THRESHOLD):
+    """
+    Converts cosine distances into (relevance scores, context precision)
+    in a single vectorized pass.
+    """
+    scores = 1.0 - np.asarray(distances, dtype=np.float32)
+    precision = float(np.mean(scores > threshold)) if scores.size else 0.0
+    return scores, precision
+
+
+def collection_version(index):
+    """Identifies the indexed state of a collection or backend for cache keys."""
+    return f"{index.name}:{index.count()}"
+
+
+def route_languages(query, lang=None):
+    """
+    Index languages to search for a query. The query's own script decides
+    when it has letters (Kannada script also covers the Sanskrit text);
+    otherwise the UI language `lang` does, defaulting to English.
+    """
+    if FUSE_ALL_LANGUAGES:
+        return tuple(INDEX_LANGS)
+    if detect_language(query) == 'Kannada':
+        return QUERY_LANG_ROUTES['Kannada']
+    if any(ch.isalpha() for ch in query):
+        return QUERY_LANG_ROUTES['English']
+    return QUERY_LANG_ROUTES.get(lang, QUERY_LANG_ROUTES['English'])
+
+
+def fuse_max(ids, metadatas, distances, k):
+    """
+    Collapses per-language hits (sorted by distance) to one hit per verse,
+    keeping each verse's best score. Returns verse ids.
+    """
+    seen = set()
+    fused_ids, fused_metadatas, fused_distances = [], [], []
+    for vector_id, metadata, distance in zip(ids, metadatas, distances):
+        vid = metadata.get('verse_id', vector_id)
+        if vid in seen:
+            continue
+        seen.add(vid)
+        fused_ids.append(vid)
+        fused_metadatas.append(metadata)
+        fused_distances.append(distance)
+        if len(fused_ids) == k:
+            break
+    return fused_ids, fused_metadatas, fused_distances
+
+
+def reference_result(lexical, query, k):
+    """
+    Looks up a verse reference ("2.47", "verse 20") in the lexical index
+    without embedding, or returns None if the query is not a reference.
+    Scores mark exact reference matches, not cosine similarity.
+    """
+    reference = parse_verse_reference(query)
+    if reference is None:
+        return None
+    docs = lexical.lookup(*reference)[:k]
+    return SearchResult(
+        ids=[lexical.verse_ids[doc] for doc in docs],
+        metadatas=[lexical.metadatas[doc] for doc in docs],
+        scores=np.ones(len(docs), dtype=np.float32),
+        context_precision=1.0 if docs else 0.0,
+        source="reference",
+    )
+
+
+def lexical_matches(index, query, query_embedding, langs, k):
+    """
+    Verses containing every word of a short rare-word query, best cosine
+    first, scored against the query embedding. Skips the vector search.
+    Empty lists if the query does not qualify.
+    """
+    lexical = index.lexical
+    docs = lexical.exact_matches(query, LEXICAL_FAST_PATH_MAX_TOKENS, LEXICAL_FAST_PATH_MAX_DF)
+    if not docs:
+        return [], [], []  # Not a short rare-word query: use the vector search
+    ids = [lexical.verse_ids[doc] for doc in docs]
+    distances = index.distances(query_embedding, ids, langs)
+    order = sorted(range(len(ids)), key=distances.__getitem__)[:k]
+    return [ids[j] for j in order], [lexical.metadatas[docs[j]] for j in order], [distances[j] for j in order]
+
+
+def fuse_hybrid(index, query, query_embedding, langs, ids, metadatas, distances, k):
+    """
+    Reciprocal-rank fusion of the dense candidates with the BM25 ranking.
+    Verses found only lexically are scored against the query embedding, so
+    every result carries its real cosine distance.
+    Returns (ids, metadatas, distances) for the top k fused verses.
+    """
+    lexical = index.lexical
+    lexical_hits = lexical.search(query, HYBRID_CANDIDATES)
+    dense = {vid: (metadata, distance) for vid, metadata, distance in zip(ids, metadatas, distances)}
+    lexical_metadatas = {lexical.verse_ids[doc]: lexical.metadatas[doc] for doc, _ in lexical_hits}
+    fused = rrf_fuse([ids, [lexical.verse_ids[doc] for doc, _ in lexical_hits]], k=RRF_K)[:k]
+    lexical_only = [vid for vid in fused if vid not in dense]
+    scored = dict(zip(lexical_only, index.distances(query_embedding, lexical_only, langs)))
+    return (
+        fused,
+        [dense[vid][0] if vid in dense else lexical_metadatas[vid] for vid in fused],
+        [dense[vid][1] if vid in dense else scored[vid] for vid in fused],
+    )
+
+
+def hydrate(store, ids, distances):
+    """
+    Replaces the index's id-only metadata with the store's verse records.
+    Returns (ids, verses, distances); ids the store does not know are dropped
+    and counted in the "hydrate_unknown_ids" metric.
+    """
+    hits = [(vid, store.by_id(vid), distance) for vid, distance in zip(ids, distances)]
+    known = [hit for hit in hits if hit[1] is not None]
+    if len(known) < len(hits):
+        metrics.incr("hydrate_unknown_ids", len(hits) - len(known))
+    hits = known
+    return [h[0] for h in hits], [h[1] for h in hits], [h[2] for h in hits]
+
+
+def rerank_pools(queries, pools, deadline, k):
+    """
+    Reorders each first-stage pool (query index -> (langs, ids, metadatas,
+    distances, source)) by cross-encoder score, and trims it to k. A pool keeps its first-stage order if its pass would
+    miss the deadline.
+    """
+    from reranker import get_reranker
+
+    order = list(pools)
+    all_scores = get_reranker().score_batch(
+        [(queries[i], pools[i][0], pools[i][1], pools[i][2]) for i in order], deadline
+    )
+    for i, scores in zip(order, all_scores):
+        langs, ids, metadatas, distances, source = pools[i]
+        if scores is not None:
+            top = np.argsort(-scores, kind='stable')
+            ids, metadatas, distances = ([column[j] for j in top] for column in (ids, metadatas, distances))
+            source = "rerank"
+        pools[i] = (langs, ids[:k], metadatas[:k], distances[:k], source)
+
+
+def search_batch(index, queries, k=TOP_K, lang=None, rerank=RERANK):
+    """
+    Embeds all queries in one call and retrieves top-k verses for each from
+    a retrieval backend (see retrieval_backends). Queries are grouped by
+    their language route, with one backend call per route. Verse references
+    are looked up without embedding, and short rare-word queries skip the
+    vector search (their matches are only scored). With `rerank`, a wider
+    candidate pool is reordered by the cross-encoder before trimming to k.
+    """
+    if not queries:
+        return []
+    if index.embeds_queries:
+        return index.search_queries(queries, k, lang=lang)
+    start = time.perf_counter()
+    lexical = index.lexical
+    store = index.store if index.store is not None else get_store()
+    search_results = [None] * len(queries)
+    pending = []
+    for i, query in enumerate(queries):
+        if lexical is not None:
+            with metrics.span("lexical_fast_path"):
+                search_results[i] = reference_result(lexical, query, k)
+        if search_results[i] is None:
+            pending.append(i)
+    if not pending:
+        return search_results
+
+    query_embeddings = embed([queries[i] for i in pending])
+    pool = max(k, RERANK_CANDIDATES) if rerank else k
+    depth = max(pool, HYBRID_CANDIDATES) if lexical is not None else pool
+    pools = {}  # query index -> (langs, ids, metadatas, distances, source)
+    routes = {}
+    for row, i in enumerate(pending):
+        langs = route_languages(queries[i], lang)
+        if lexical is not None:
+            with metrics.span("lexical_fast_path"):
+                ids, metadatas, distances = lexical_matches(index, queries[i], query_embeddings[row], langs, pool)
+            if ids:
+                pools[i] = (langs, *hydrate(store, ids, distances), "lexical")
+                continue
+        routes.setdefault(langs, []).append(row)
+
+    for langs, rows in routes.items():
+        # A verse can match in each of its languages: over-fetch, then fuse
+        with metrics.span("vector_query"):
+            all_ids, all_metadatas, all_distances = index.search(
+                query_embeddings[rows], depth * len(langs), langs=langs
+            )
+        for row, ids, metadatas, distances in zip(rows, all_ids, all_metadatas, all_distances):
+            i = pending[row]
+            ids, metadatas, distances = fuse_max(ids, metadatas, distances, depth)
+            if lexical is not None:
+                with metrics.span("lexical_fusion"):
+                    ids, metadatas, distances = fuse_hybrid(
+                        index, queries[i], query_embeddings[row], langs, ids, metadatas, distances, pool
+                    )
+            ids, metadatas, distances = hydrate(store, ids, distances)
+            pools[i] = (langs, ids, metadatas, distances, "hybrid" if lexical is not None else "dense")
+
+    metrics.observe("first_stage", time.perf_counter() - start)
+    if rerank:
+        from reranker import deadline_for
+        with metrics.span("rerank"):
+            rerank_pools(queries, pools, deadline_for(start, len(pools)), k)
+    for i, (_, ids, metadatas, distances, source) in pools.items():
+        with metrics.span("metrics"):
+            scores, precision = compute_metrics(distances)
+        search_results[i] = SearchResult(
+            ids=ids,
+            metadatas=metadatas,
+            scores=scores,
+            context_precision=precision,
+            source=source,
+        )
+    return search_results
+
+
+def search(index, query, k=TOP_K, lang=None):
+    """Embeds the query once and retrieves the top-k verses from the backend."""
+    return search_batch(index, [query], k=k, lang=lang)[0]
+
+
+def cached_search(index, query, lang, version, k=TOP_K):
+    """search() through the process-wide result cache."""
+    key = ResultCache.make_key(query, lang, k, version)
+    result = result_cache.get(key)
+    if result is None:
+        result = search(index, query, k=k, lang=lang)
+        result_cache.put(key, result)
+    return result
+
+
+_SAMPLE_QUERY_ROW = re.compile(r"^\|\s*\d+\s*\|\s*\*\*(.+?)\*\*\s*\|", re.MULTILINE)
+
+
+def detect_language(text):
+    """'Kannada' if the text contains Kannada script, otherwise 'English'."""
+    return 'Kannada' if any('\u0c80' <= ch <= '\u0cff' for ch in text) else 'English'
+
+
+def load_sample_queries(path):
+    """Extracts the bold user queries from the tables in SAMPLE_QUERIES.md."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return []
+    return [(query, detect_language(query)) for query in _SAMPLE_QUERY_ROW.findall(content)]
+
+
+def prewarm(index, queries, version, k=TOP_K):
+    """
+    Fills the result cache for (query, language) pairs that are not cached yet.
+    Each distinct (query text, language route) is searched once, batched per
+    UI language. Returns the number of entries added.
+    """
+    pending = {}  # (normalized query, route) -> (query, lang, [keys])
+    for query, lang in queries:
+        key = ResultCache.make_key(query, lang, k, version)
+        if key in result_cache:
+            continue
+        _, _, keys = pending.setdefault((key[0], route_languages(query, lang)), (query, lang, []))
+        if key not in keys:
+            keys.append(key)
+    groups = list(pending.values())
+    results = []
+    for lang in {lang for _, lang, _ in groups}:
+        batch = [group for group in groups if group[1] == lang]
+        results.extend(zip(batch, search_batch(index, [query for query, _, _ in batch], k=k, lang=lang)))
+    added = 0
+    for (_, _, keys), result in results:
+        for key in keys:
+            result_cache.put(key, result)
+            added += 1
+    return added
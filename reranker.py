@@ -0,0 +1,132 @@
+"""
+Second-stage reranking with a multilingual cross-encoder.
+
+The first stage (dense, hybrid) retrieves RERANK_CANDIDATES verses cheaply;
+the cross-encoder then scores the uncached (query, verse) pairs of each pool
+in forward batches of at most RERANK_CANDIDATES pairs and reorders it.
+
+Reranking is budgeted: RERANK_BUDGET_MS per query, so a batch of n queries
+shares n budgets. The cost of each pool's pass is predicted from a running
+per-pair estimate, and a pool that would not finish before the deadline
+keeps its first-stage order while the others are still reranked. Scores are
+cached per (query, verse) so repeated and overlapping queries only pay for
+new pairs.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from config import (
+    INDEX_LANGS, RERANK_BUDGET_MS, RERANK_CACHE_MAX_ENTRIES, RERANK_CANDIDATES, RERANK_MODEL_NAME,
+    RESULT_CACHE_TTL_SECONDS,
+)
+from instrumentation import metrics
+from result_cache import ResultCache, normalize_query
+
+# Smoothing of the per-pair cost estimate (weight of the newest pass)
+_COST_SMOOTHING = 0.3
+
+
+class Reranker:
+    """Cross-encoder with a (query, verse) score cache and a per-pair cost estimate."""
+
+    def __init__(self, model_name=RERANK_MODEL_NAME, cache_entries=RERANK_CACHE_MAX_ENTRIES):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name)
+        self.cache = ResultCache(max_entries=cache_entries, ttl_seconds=RESULT_CACHE_TTL_SECONDS)
+        self.pair_seconds = None  # Unknown until the first pass
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def document(metadata, langs):
+        """Verse text in the first language the query was routed to."""
+        return metadata[INDEX_LANGS[langs[0]]]
+
+    def estimate(self, pairs):
+        """Predicted seconds to score `pairs` uncached pairs (0 if not yet measured)."""
+        return pairs * self.pair_seconds if self.pair_seconds is not None else 0.0
+
+    def score_batch(self, requests, deadline=None):
+        """
+        Scores candidate pools for several queries at once.
+
+        `requests` is a list of (query, langs, verse_ids, metadatas). Returns
+        one array of scores per request, or None for a request whose pass
+        would end after `deadline` (a time.perf_counter() value).
+        """
+        scores, scored, cached_pairs = [], {}, 0
+        for query, langs, verse_ids, metadatas in requests:
+            normalized = normalize_query(query)
+            row = np.empty(len(verse_ids), dtype=np.float32)
+            missing = {}
+            for c, (vid, metadata) in enumerate(zip(verse_ids, metadatas)):
+                key = (normalized, vid, langs[0])
+                if key in scored:  # Scored for an earlier request of this batch
+                    row[c] = scored[key]
+                    continue
+                cached = self.cache.get(key)
+                if cached is None:
+                    missing.setdefault(key, (query, self.document(metadata, langs), []))[2].append(c)
+                else:
+                    row[c] = cached
+                    cached_pairs += 1
+            if missing:
+                if deadline is not None and time.perf_counter() + self.estimate(len(missing)) > deadline:
+                    metrics.incr("rerank_budget_fallbacks")
+                    scores.append(None)
+                    continue
+                predicted = self._predict([(query, document) for query, document, _ in missing.values()])
+                for (key, (_, _, columns)), score in zip(missing.items(), predicted):
+                    self.cache.put(key, float(score))
+                    scored[key] = score
+                    row[columns] = score
+            scores.append(row)
+        metrics.incr("rerank_pairs_cached", cached_pairs)
+        return scores
+
+    def _predict(self, pairs):
+        """Cross-encoder scores for (query, document) pairs, RERANK_CANDIDATES per forward batch."""
+        start = time.perf_counter()
+        with metrics.span("rerank_model"):
+            predicted = np.asarray(
+                self.model.predict(pairs, batch_size=RERANK_CANDIDATES, show_progress_bar=False),
+                dtype=np.float32,
+            )
+        self._update_cost((time.perf_counter() - start) / len(pairs))
+        metrics.incr("rerank_pairs_scored", len(pairs))
+        return predicted
+
+    def warm_up(self, pairs=RERANK_CANDIDATES):
+        """Runs one pool-sized pass so the model is initialized and the cost estimate seeded."""
+        batch = [("warm up", "warm up")] * pairs
+        start = time.perf_counter()
+        self.model.predict(batch, batch_size=pairs, show_progress_bar=False)
+        self._update_cost((time.perf_counter() - start) / pairs)
+
+    def _update_cost(self, seconds):
+        with self._lock:
+            if self.pair_seconds is None:
+                self.pair_seconds = seconds
+            else:
+                self.pair_seconds += _COST_SMOOTHING * (seconds - self.pair_seconds)
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    """Returns the process-wide reranker, loading the cross-encoder on first use."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = Reranker()
+    return _reranker
+
+
+def deadline_for(start, queries=1, budget_ms=RERANK_BUDGET_MS):
+    """perf_counter() deadline for a batch of `queries` that started at `start`; None means no budget."""
+    return start + queries * budget_ms / 1000.0 if budget_ms else None
@@ -0,0 +1,91 @@
+"""
+Process-wide retrieval result cache.
+
+Search results depend only on the query text, the language, k and the
+state of the collection, so they can be shared safely across every
+Streamlit session in the process. Entries are bounded in number, evicted
+least-recently-used first and expire after a time-to-live.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    """Canonical form of a query: NFC, case-folded, single-spaced, trimmed."""
+    text = unicodedata.normalize("NFC", text)
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and hit/miss counters."""
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(query, lang, k, version):
+        return (normalize_query(query), lang, k, version)
+
+    def get(self, key):
+        """Returns the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > self._clock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
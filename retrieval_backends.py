@@ -0,0 +1,274 @@
+"""
+Pluggable retrieval backends behind query_engine's search functions.
+
+Every backend answers the same question: given a batch of L2-normalized
+query embeddings, return the top-k (ids, metadatas, cosine distances) for
+each query, optionally restricted to vectors of some index languages (see
+INDEX_LANGS). Two implementations are provided:
+
+- ChromaBackend: the persistent Chroma collection (HNSW, approximate).
+- NumpyBackend: an exact in-process search over a normalized embedding
+  matrix saved as .npy and memory-mapped at load time. For a corpus of a
+  few thousand verses one matrix product plus argpartition is faster than
+  going through Chroma's client, SQLite and HNSW layers.
+
+Select one with RETRIEVAL_BACKEND in config.py. The index only holds ids
+and filter metadata; create_backend() attaches the verse store results are
+hydrated from, and a lexical index (see lexical_index) built over the same
+verses.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from config import NUMPY_INDEX_DIR, NUMPY_INDEX_DTYPE, INDEX_LANGS, LEXICAL_SEARCH
+from ingest import vector_id
+from lexical_index import LexicalIndex
+from verse_store import get_store
+
+EMBEDDINGS_FILE = "embeddings.npy"
+VERSES_FILE = "verses.json"
+
+_EXPORT_PAGE_SIZE = 512
+_SCORE_CHUNK_ROWS = 8192  # Rows scored per matrix product when upcasting float16
+
+
+class RetrievalBackend:
+    """Interface shared by all retrieval backends."""
+
+    name = "base"
+    lexical = None  # LexicalIndex over the same verses, when enabled
+    store = None  # VerseStore that search results are hydrated from (see verse_store)
+    embeds_queries = False  # True if the backend takes raw query text (see search_queries)
+
+    def search(self, query_embeddings, k, langs=None):
+        """
+        Returns (ids, metadatas, distances), each a list with one entry per
+        query. `langs` limits the search to vectors of those index languages.
+        """
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def distances(self, query_embedding, verse_ids, langs):
+        """
+        Cosine distance from one query embedding to each verse, the best over
+        the verse's vectors in `langs` (1.0 for verses that are not indexed).
+        """
+        raise NotImplementedError
+
+    def search_queries(self, queries, k, lang=None):
+        """SearchResults for raw queries, for backends that embed remotely."""
+        raise NotImplementedError
+
+
+def best_distances(query_embedding, verse_ids, vector_ids, embeddings):
+    """Per verse, 1 - the highest dot product of the query with its vectors."""
+    best = {}
+    if len(vector_ids):
+        similarities = np.asarray(embeddings, dtype=np.float32) @ np.asarray(query_embedding, dtype=np.float32)
+        for vec_id, similarity in zip(vector_ids, similarities.tolist()):
+            vid = vec_id.rsplit(":", 1)[0]
+            best[vid] = max(best.get(vid, similarity), similarity)
+    return [1.0 - best.get(vid, 0.0) for vid in verse_ids]
+
+
+def to_cosine_distances(distances, space):
+    """
+    Converts Chroma distances in `space` into cosine distances (1 - cosine
+    similarity), assuming normalized embeddings. Chroma's "l2" is squared L2.
+    """
+    if space == "l2":
+        return [[d / 2.0 for d in row] for row in distances]
+    return distances  # "cosine" and "ip" are both 1 - dot product
+
+
+class ChromaBackend(RetrievalBackend):
+    """Delegates to a Chroma collection; distances are reported in cosine space."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = collection.name
+        self.space = (collection.metadata or {}).get("hnsw:space", "l2")  # Chroma's default
+
+    def search(self, query_embeddings, k, langs=None):
+        where = None
+        if langs:
+            where = {"lang": langs[0]} if len(langs) == 1 else {"lang": {"$in": list(langs)}}
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=k,
+            where=where,
+            include=['metadatas', 'distances'],
+        )
+        return results['ids'], results['metadatas'], to_cosine_distances(results['distances'], self.space)
+
+    def count(self):
+        return self.collection.count()
+
+    def distances(self, query_embedding, verse_ids, langs):
+        if not verse_ids:
+            return []
+        found = self.collection.get(
+            ids=[vector_id(vid, lang) for vid in verse_ids for lang in langs], include=['embeddings']
+        )
+        return best_distances(query_embedding, verse_ids, found['ids'], found['embeddings'])
+
+
+class NumpyBackend(RetrievalBackend):
+    """
+    Exact cosine search over a memory-mapped, normalized embedding matrix.
+    Rows are grouped by language, so a language-restricted search scores
+    only that language's contiguous slice.
+    """
+
+    def __init__(self, index_dir=NUMPY_INDEX_DIR):
+        with open(os.path.join(index_dir, VERSES_FILE), 'r', encoding='utf-8') as f:
+            verses = json.load(f)
+        self.name = verses['name']
+        self.version = verses.get('version')
+        self.ids = verses['ids']
+        self.metadatas = verses['metadatas']
+        self.lang_ranges = {lang: tuple(bounds) for lang, bounds in verses.get('lang_ranges', {}).items()}
+        # Read-only mapping: pages are shared between processes via the OS cache
+        self.embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode='r')
+        self._rows = None  # Vector id -> matrix row, built on first distances() call
+
+    def count(self):
+        return len(self.ids)
+
+    def distances(self, query_embedding, verse_ids, langs):
+        if self._rows is None:
+            self._rows = {vec_id: row for row, vec_id in enumerate(self.ids)}
+        wanted = [vector_id(vid, lang) for vid in verse_ids for lang in langs]
+        found = [v for v in wanted if v in self._rows]
+        rows = [self._rows[v] for v in found]
+        return best_distances(query_embedding, verse_ids, found, self.embeddings[rows])
+
+    def _ranges(self, langs):
+        """Row ranges to score: the languages' slices, or every row."""
+        if not langs:
+            return [(0, len(self.ids))]
+        return sorted(self.lang_ranges[lang] for lang in langs if lang in self.lang_ranges)
+
+    def _scores(self, queries, start, stop):
+        if self.embeddings.dtype == np.float32:
+            return self.embeddings[start:stop] @ queries.T
+        scores = np.empty((stop - start, len(queries)), dtype=np.float32)
+        for offset in range(start, stop, _SCORE_CHUNK_ROWS):
+            block = np.asarray(self.embeddings[offset:min(offset + _SCORE_CHUNK_ROWS, stop)], dtype=np.float32)
+            scores[offset - start:offset - start + len(block)] = block @ queries.T
+        return scores
+
+    def search(self, query_embeddings, k, langs=None):
+        ranges = self._ranges(langs)
+        k = min(k, sum(stop - start for start, stop in ranges))
+        if k == 0:
+            empty = [[] for _ in query_embeddings]
+            return empty, list(empty), list(empty)
+
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.embeddings.shape[1])
+        # (n_rows, n_queries) over the selected ranges, and the matrix row of each
+        scores = np.concatenate([self._scores(queries, start, stop) for start, stop in ranges])
+        rows = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+        all_ids, all_metadatas, all_distances = [], [], []
+        for column in scores.T:
+            top = np.argpartition(-column, k - 1)[:k]
+            top = top[np.argsort(-column[top])]
+            all_ids.append([self.ids[i] for i in rows[top]])
+            all_metadatas.append([self.metadatas[i] for i in rows[top]])
+            all_distances.append((1.0 - column[top]).tolist())
+        return all_ids, all_metadatas, all_distances
+
+    @staticmethod
+    def snapshot_version(index_dir=NUMPY_INDEX_DIR):
+        """Version recorded in an existing snapshot, or None if there is none."""
+        try:
+            with open(os.path.join(index_dir, VERSES_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f).get('version')
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def export(collection, version, index_dir=NUMPY_INDEX_DIR, dtype=NUMPY_INDEX_DTYPE):
+        """
+        Writes the collection's embeddings to a normalized .npy matrix and its
+        ids/metadata to a compact JSON file, paging through Chroma one
+        language at a time so memory stays bounded and each language's rows
+        are contiguous. Files are written to temporary names and renamed last.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        total = collection.count()
+        embeddings_path = os.path.join(index_dir, EMBEDDINGS_FILE)
+        verses_path = os.path.join(index_dir, VERSES_FILE)
+        tmp_embeddings = embeddings_path + ".tmp.npy"
+
+        matrix = None
+        ids, metadatas, lang_ranges = [], [], {}
+        for lang in INDEX_LANGS:
+            start = len(ids)
+            for offset in range(0, total, _EXPORT_PAGE_SIZE):
+                page = collection.get(
+                    where={"lang": lang},
+                    include=['embeddings', 'metadatas'],
+                    limit=_EXPORT_PAGE_SIZE,
+                    offset=offset,
+                )
+                if not page['ids']:
+                    break
+                vectors = np.asarray(page['embeddings'], dtype=np.float32)
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                vectors /= np.maximum(norms, 1e-12)
+                if matrix is None:
+                    matrix = np.lib.format.open_memmap(
+                        tmp_embeddings, mode='w+', dtype=np.dtype(dtype), shape=(total, vectors.shape[1])
+                    )
+                matrix[len(ids):len(ids) + len(vectors)] = vectors
+                ids.extend(page['ids'])
+                metadatas.extend(page['metadatas'])
+            lang_ranges[lang] = [start, len(ids)]
+
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(tmp_embeddings, mode='w+', dtype=np.dtype(dtype), shape=(0, 0))
+        matrix.flush()
+        del matrix
+
+        tmp_verses = verses_path + ".tmp"
+        with open(tmp_verses, 'w', encoding='utf-8') as f:
+            json.dump(
+                {
+                    'name': collection.name,
+                    'version': version,
+                    'ids': ids,
+                    'metadatas': metadatas,
+                    'lang_ranges': lang_ranges,
+                },
+                f,
+                ensure_ascii=False,
+                separators=(',', ':'),
+            )
+        os.replace(tmp_embeddings, embeddings_path)
+        os.replace(tmp_verses, verses_path)
+
+
+def create_backend(kind, collection, version, index_dir=NUMPY_INDEX_DIR, store=None):
+    """
+    Builds the configured backend on top of a synced collection. The NumPy
+    snapshot is re-exported whenever its version no longer matches. Results
+    are hydrated from `store` (the corpus verse store by default).
+    """
+    if kind == "chroma":
+        backend = ChromaBackend(collection)
+    elif kind == "numpy":
+        if NumpyBackend.snapshot_version(index_dir) != version:
+            NumpyBackend.export(collection, version, index_dir=index_dir)
+        backend = NumpyBackend(index_dir)
+    else:
+        raise ValueError(f"Unknown retrieval backend: {kind!r} (expected 'chroma' or 'numpy')")
+    backend.store = store if store is not None else get_store()
+    if LEXICAL_SEARCH:
+        backend.lexical = LexicalIndex.build(backend.store)
+    return backend
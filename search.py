@@ -0,0 +1,124 @@
+"""
+Headless batch search over the verse index.
+
+Reads one query per line from files or stdin, embeds them in large batches
+(one model.encode call per batch; verse references and rare-word queries
+skip it), runs batched top-k retrieval through the same
+query_engine/retrieval_backends path as the app, and streams one JSON
+object per query to stdout.
+
+Usage:
+    python search.py queries.txt > results.jsonl
+    cat queries.txt | python search.py --k 5 --backend numpy
+    python search.py --sample-queries         # the queries in SAMPLE_QUERIES.md
+    python search.py --rerank queries.txt     # cross-encoder rerank within the latency budget
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import ingest
+import query_engine
+import retrieval_backends
+from instrumentation import metrics
+from config import (
+    DB_PATH, CORPUS_FILES, TOP_K, RETRIEVAL_BACKEND, RELEVANCE_THRESHOLD,
+    SAMPLE_QUERIES_PATH, RERANK,
+)
+
+DEFAULT_BATCH_SIZE = 256
+
+
+def open_backend(kind=RETRIEVAL_BACKEND):
+    """Syncs the index with the corpus and opens the configured backend. Returns (backend, version)."""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=DB_PATH)
+    collection, stats = ingest.sync_index(client, ingest.expand_paths(CORPUS_FILES))
+    version = f"{collection.name}:{stats['version']}"
+    return retrieval_backends.create_backend(kind, collection, version), version
+
+
+def iter_queries(sources):
+    """Yields non-empty, stripped lines from the given files ('-' for stdin)."""
+    for source in sources:
+        stream = sys.stdin if source == "-" else open(source, 'r', encoding='utf-8')
+        try:
+            for line in stream:
+                query = line.strip()
+                if query:
+                    yield query
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+
+def result_record(query, result):
+    """JSON-serializable summary of one SearchResult."""
+    return {
+        "query": query,
+        "lang": query_engine.detect_language(query),
+        "source": result.source,
+        "score_kind": result.score_kind,
+        "relevant": result.is_relevant(),
+        "context_precision": round(result.context_precision, 4),
+        "results": [
+            {
+                "id": verse_id,
+                "chapter": meta.get("chapter"),
+                "verse": meta.get("verse"),
+                "relevance": round(float(score), 4),
+            }
+            for verse_id, meta, score in zip(result.ids, result.metadatas, result.scores)
+        ],
+    }
+
+
+def run(backend, queries, k=TOP_K, batch_size=DEFAULT_BATCH_SIZE, out=sys.stdout, rerank=RERANK):
+    """Searches all queries in batches, writing JSONL to out. Returns the number processed."""
+    processed = 0
+    for batch in ingest.batched(queries, batch_size):
+        for query, result in zip(batch, query_engine.search_batch(backend, batch, k=k, rerank=rerank)):
+            out.write(json.dumps(result_record(query, result), ensure_ascii=False) + "\n")
+        out.flush()
+        processed += len(batch)
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch semantic search over the Bhagavad Gita index.")
+    parser.add_argument("files", nargs="*", default=["-"], help="Query files, one query per line ('-' = stdin)")
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default=RETRIEVAL_BACKEND)
+    parser.add_argument("--sample-queries", action="store_true", help=f"Search the queries in {SAMPLE_QUERIES_PATH}")
+    parser.add_argument("--rerank", action=argparse.BooleanOptionalAction, default=RERANK,
+                        help="Rerank a wider candidate pool with the cross-encoder")
+    parser.add_argument("--metrics", help="Write per-stage latencies here when done (.prom or .json)")
+    args = parser.parse_args()
+
+    backend, version = open_backend(args.backend)
+    query_engine.get_model()  # Load before timing so throughput reflects search only
+
+    if args.sample_queries:
+        queries = iter(q for q, _ in query_engine.load_sample_queries(SAMPLE_QUERIES_PATH))
+    else:
+        queries = iter_queries(args.files)
+
+    start = time.perf_counter()
+    processed = run(backend, queries, k=args.k, batch_size=args.batch_size, rerank=args.rerank)
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    print(
+        f"{processed} queries in {elapsed:.2f}s ({rate:.1f} queries/s) "
+        f"backend={args.backend} index={version} threshold={RELEVANCE_THRESHOLD}",
+        file=sys.stderr,
+    )
+    if args.metrics:
+        metrics.write_snapshot(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Async HTTP service over the shared model, index and audio packs.
+
+A plain ASGI application served by uvicorn:
+
+    GET /search?q=...&k=3&lang=English   top-k verses as JSON
+    GET /verse/{n}?chapter=2             one verse
+    GET /audio/{lang}/{n}?chapter=2      the clip, with HTTP Range support
+    GET /metrics                         Prometheus text (see instrumentation)
+    GET /healthz                         readiness
+
+Concurrent /search requests are not embedded one by one: a micro-batcher
+gathers the queries that arrive within a few milliseconds (up to a maximum
+batch size) into one batched encode and one index search, so throughput
+grows with batch efficiency rather than request count.
+
+Usage:
+    python service.py                     # SERVICE_HOST:SERVICE_PORT from config
+    python service.py --port 8600
+"""
+
+import argparse
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import audio_pack
+import query_engine
+import startup
+from audio_pipeline import find_audio_file
+from audio_store import AudioStore
+from config import (
+    TOP_K, MAX_K, RETRIEVAL_BACKEND, AUDIO_LANGS, AUDIO_CACHE_MAX_BYTES,
+    SERVICE_HOST, SERVICE_PORT, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS,
+)
+from instrumentation import metrics
+from result_cache import ResultCache
+
+AUDIO_CHUNK_BYTES = 64 * 1024
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class MicroBatcher:
+    """
+    Collects search requests into batches. The first request of a batch
+    waits at most `max_wait_ms` for company; a full batch is sent at once.
+    Batches run on a single worker thread, one search_batch call per
+    (language, k) group.
+    """
+
+    def __init__(self, index, max_batch=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS):
+        self.index = index
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-batch")
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def search(self, query, lang, k):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, lang, k, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            metrics.incr("search_batches")
+            metrics.incr("search_batched_queries", len(batch))
+            try:
+                results = await loop.run_in_executor(self._executor, self._search, batch)
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (*_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _search(self, batch):
+        groups = {}
+        for position, (query, lang, k, _) in enumerate(batch):
+            groups.setdefault((lang, k), []).append(position)
+        results = [None] * len(batch)
+        with metrics.span("search_batch"):
+            for (lang, k), positions in groups.items():
+                found = query_engine.search_batch(self.index, [batch[p][0] for p in positions], k=k, lang=lang)
+                for position, result in zip(positions, found):
+                    results[position] = result
+        return results
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single 'bytes=' range, None for no range, or 'invalid'."""
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return "invalid"
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        return "invalid"
+    return start, end
+
+
+class GitaService:
+    """ASGI application; heavy state is loaded at lifespan startup."""
+
+    def __init__(self, backend_kind=RETRIEVAL_BACKEND):
+        self.warmup = startup.Warmup(backend_kind)
+        self.batcher = None
+        self.store = None  # VerseStore of the indexed corpus
+        self.audio_store = AudioStore(AUDIO_CACHE_MAX_BYTES)
+        self.packs = {}
+
+    # --- Lifespan ---
+
+    async def startup(self):
+        self.warmup.start()
+        ready = await asyncio.get_running_loop().run_in_executor(None, self.warmup.wait)
+        if not ready:
+            raise RuntimeError(f"Warm-up failed: {self.warmup.error}")
+        backend = self.warmup.backend
+        self.store = backend.store
+        self.packs = {lang: audio_pack.open_pack(lang) for lang in AUDIO_LANGS}
+        self.batcher = MicroBatcher(backend)
+        self.batcher.start()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            with metrics.span("http_request"):
+                await self._route(scope, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.batcher is not None:
+                    await self.batcher.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # --- Routing ---
+
+    async def _route(self, scope, send):
+        if scope['method'] not in ('GET', 'HEAD'):
+            return await self._send_json(send, 405, {"error": "method not allowed"})
+        path = scope['path'].rstrip('/') or '/'
+        params = {key: values[-1] for key, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+        headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+        parts = path.strip('/').split('/')
+        try:
+            if path == '/search':
+                return await self.search(send, params)
+            if len(parts) == 2 and parts[0] == 'verse':
+                return await self.verse(send, int(parts[1]), params)
+            if len(parts) == 3 and parts[0] == 'audio':
+                return await self.audio(send, parts[1], int(parts[2]), params, headers, scope['method'])
+            if path == '/metrics':
+                return await self._send(send, 200, metrics.to_prometheus().encode('utf-8'),
+                                        'text/plain; version=0.0.4')
+            if path == '/healthz':
+                return await self._send_json(send, 200, {"ready": self.warmup.is_ready, "version": self.warmup.version})
+        except ValueError as e:
+            return await self._send_json(send, 400, {"error": str(e)})
+        return await self._send_json(send, 404, {"error": "not found"})
+
+    # --- Endpoints ---
+
+    async def search(self, send, params):
+        query = params.get('q', '').strip()
+        if not query:
+            raise ValueError("missing query parameter 'q'")
+        k = int(params.get('k', TOP_K))
+        if not 1 <= k <= MAX_K:
+            raise ValueError(f"k must be between 1 and {MAX_K}")
+        lang = params.get('lang') or query_engine.detect_language(query)
+        version = self.warmup.version
+
+        key = ResultCache.make_key(query, lang, k, version)
+        result = query_engine.result_cache.get(key)
+        if result is None:
+            result = await self.batcher.search(query, lang, k)
+            query_engine.result_cache.put(key, result)
+
+        verses = [
+            {
+                "id": verse_id,
+                "relevance": round(float(score), 4),
+                **meta.as_dict(),
+            }
+            for verse_id, meta, score in zip(result.ids, result.metadatas, result.scores)
+        ]
+        await self._send_json(send, 200, {
+            "query": query,
+            "lang": lang,
+            "source": result.source,
+            "score_kind": result.score_kind,
+            "relevant": result.is_relevant(),
+            "context_precision": round(result.context_precision, 4),
+            "results": verses,
+        })
+
+    def _resolve_chapter(self, params, verse_number):
+        if 'chapter' in params:
+            return int(params['chapter'])
+        chapters = self.store.chapters_of(verse_number)
+        return chapters[0] if chapters else None
+
+    async def verse(self, send, verse_number, params):
+        chapter = self._resolve_chapter(params, verse_number)
+        verse = self.store.get(chapter, verse_number)
+        if verse is None:
+            return await self._send_json(send, 404, {"error": f"verse {verse_number} not found"})
+        await self._send_json(send, 200, verse.as_dict())
+
+    def _clip(self, lang, chapter, verse_number):
+        """(buffer, mime) for a clip: a zero-copy pack slice, or the file through the audio store."""
+        pack = self.packs.get(lang)
+        if pack is not None and (chapter, verse_number) in pack:
+            return pack.clip(chapter, verse_number), pack.mime
+
+        def load():
+            path = find_audio_file(lang, chapter, verse_number)
+            try:
+                return path.read_bytes() if path is not None else None
+            except FileNotFoundError:
+                return None
+
+        data = self.audio_store.get((chapter, verse_number, lang), load)
+        return (memoryview(data), 'audio/mp3') if data is not None else (None, None)
+
+    async def audio(self, send, lang, verse_number, params, headers, method):
+        if lang not in AUDIO_LANGS:
+            return await self._send_json(send, 404, {"error": f"unknown language {lang!r}"})
+        chapter = self._resolve_chapter(params, verse_number)
+        with metrics.span("audio_lookup"):
+            clip, mime = self._clip(lang, chapter, verse_number)
+        if clip is None or len(clip) == 0:  # An empty clip has no byte to serve or stream
+            return await self._send_json(send, 404, {"error": "audio not available"})
+
+        size = len(clip)
+        byte_range = parse_range(headers.get('range'), size)
+        if byte_range == "invalid":
+            return await self._send(send, 416, b"", 'text/plain', [(b'content-range', f"bytes */{size}".encode())])
+        status, start, end, extra = 200, 0, size - 1, []
+        if byte_range is not None:
+            status, (start, end) = 206, byte_range
+            extra = [(b'content-range', f"bytes {start}-{end}/{size}".encode())]
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', mime.encode()),
+                (b'content-length', str(end - start + 1).encode()),
+                (b'accept-ranges', b'bytes'),
+                (b'cache-control', b'public, max-age=86400'),
+            ] + extra,
+        })
+        if method == 'HEAD':
+            return await send({'type': 'http.response.body', 'body': b''})
+        # Stream in bounded chunks; each chunk is the only copy made of the clip
+        for offset in range(start, end + 1, AUDIO_CHUNK_BYTES):
+            chunk_end = min(offset + AUDIO_CHUNK_BYTES, end + 1)
+            await send({
+                'type': 'http.response.body',
+                'body': bytes(clip[offset:chunk_end]),
+                'more_body': chunk_end <= end,
+            })
+
+    # --- Responses ---
+
+    async def _send(self, send, status, body, content_type, extra_headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', content_type.encode()),
+                (b'content-length', str(len(body)).encode()),
+            ] + list(extra_headers),
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _send_json(self, send, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        await self._send(send, status, body, 'application/json; charset=utf-8')
+
+
+app = GitaService()
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="HTTP search and audio service for the Bhagavad Gita index.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, lifespan="on")
+
+
+if __name__ == "__main__":
+    main()
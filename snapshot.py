@@ -0,0 +1,280 @@
+"""
+Portable prebuilt index snapshots.
+
+A snapshot is one compressed, checksummed file holding every vector of the
+collection with its id and metadata, plus the manifest it was
+built from (model, dimension, indexed languages, HNSW settings and
+per-verse content hashes). A fresh deployment bulk-loads it instead of
+re-embedding the corpus; sync_index() then only re-embeds verses that
+changed since the snapshot was taken.
+
+Layout:
+    magic     b"GITASNP1"
+    header    "<I" length + UTF-8 JSON (format, model, dimension, count, ...)
+    payload   zlib stream: count x dimension float32 (little-endian),
+              then UTF-8 JSON [[id, metadata], ...]
+    trailer   sha256 of everything before it
+
+Usage:
+    python snapshot.py export [path]     # sync the index, then write a snapshot
+    python snapshot.py import [path]     # replace the collection with a snapshot
+    python snapshot.py verify [path]     # checksum and compatibility only
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+import ingest
+from config import (
+    COLLECTION_NAME, CORPUS_FILES, DB_PATH, EMBEDDING_MODEL_NAME, INDEX_LANGS, SNAPSHOT_PATH,
+)
+
+MAGIC = b"GITASNP1"
+FORMAT_VERSION = 2  # 2: no documents, only ids and filter metadata
+LENGTH = struct.Struct("<I")
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+_PAGE_SIZE = 1024
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is corrupt or does not match the configuration."""
+
+
+def _tmp_path(path):
+    return f"{path}.tmp"
+
+
+def export_snapshot(collection, manifest, path=SNAPSHOT_PATH):
+    """
+    Writes every vector of a synced collection, with the manifest describing
+    it, to `path` (atomically). Returns the header.
+    """
+    total = collection.count()
+    compressor = zlib.compressobj(6)
+    digest = hashlib.sha256()
+    records = []
+    dimension = None
+    tmp_path = _tmp_path(path)
+
+    with open(tmp_path, 'wb') as f:
+        def write(data):
+            digest.update(data)
+            f.write(data)
+
+        # The header needs the dimension, so the first page is read before writing it
+        pages = (
+            collection.get(include=['embeddings', 'metadatas'], limit=_PAGE_SIZE, offset=offset)
+            for offset in range(0, total, _PAGE_SIZE)
+        )
+        first = next(pages, None)
+        if first is not None and len(first['ids']):
+            dimension = len(first['embeddings'][0])
+        header = {
+            "format": FORMAT_VERSION,
+            "collection": COLLECTION_NAME,
+            "model": manifest.get('model'),
+            "dimension": dimension,
+            "index_langs": manifest.get('index_langs'),
+            "metadata_fields": manifest.get('metadata_fields'),
+            "hnsw": manifest.get('hnsw'),
+            "version": manifest.get('version'),
+            "hashes": manifest.get('hashes'),
+            "count": total,
+            "created": time.time(),
+        }
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        write(MAGIC + LENGTH.pack(len(header_bytes)) + header_bytes)
+
+        for page in _chain(first, pages):
+            vectors = np.ascontiguousarray(page['embeddings'], dtype='<f4')
+            write(compressor.compress(vectors.tobytes()))
+            records.extend(zip(page['ids'], page['metadatas']))
+        if len(records) != total:
+            raise SnapshotError(f"collection changed during export ({len(records)} of {total} vectors read)")
+        write(compressor.compress(json.dumps(records, ensure_ascii=False).encode('utf-8')))
+        write(compressor.flush())
+        f.write(digest.digest())
+    os.replace(tmp_path, path)
+    return header
+
+
+def _chain(first, rest):
+    if first is not None:
+        yield first
+    yield from rest
+
+
+def read_header(path=SNAPSHOT_PATH):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError(f"{path} is not an index snapshot")
+        (length,) = LENGTH.unpack(f.read(LENGTH.size))
+        return json.loads(f.read(length).decode('utf-8'))
+
+
+def verify_checksum(path=SNAPSHOT_PATH):
+    """Streams the file through sha256 and compares it with the trailer."""
+    size = os.path.getsize(path)
+    if size < len(MAGIC) + LENGTH.size + DIGEST_SIZE:
+        raise SnapshotError(f"{path} is truncated")
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = size - DIGEST_SIZE
+        while remaining:
+            chunk = f.read(min(1 << 20, remaining))
+            digest.update(chunk)
+            remaining -= len(chunk)
+        if f.read(DIGEST_SIZE) != digest.digest():
+            raise SnapshotError(f"{path} failed its checksum")
+
+
+def check_compatible(header, dimension=None):
+    """
+    Raises SnapshotError unless the snapshot matches the configured model
+    (name and output `dimension`, the loaded model's by default) and index layout.
+    """
+    import query_engine
+
+    if dimension is None:
+        dimension = query_engine.get_model().dimension
+    problems = []
+    if header.get('format') != FORMAT_VERSION:
+        problems.append(f"format {header.get('format')} (expected {FORMAT_VERSION})")
+    if header.get('model') != EMBEDDING_MODEL_NAME:
+        problems.append(f"model {header.get('model')!r} (configured {EMBEDDING_MODEL_NAME!r})")
+    if header.get('count') and header.get('dimension') != dimension:
+        problems.append(f"dimension {header.get('dimension')} (model outputs {dimension})")
+    if header.get('index_langs') != INDEX_LANGS:
+        problems.append(f"indexed languages {header.get('index_langs')} (configured {INDEX_LANGS})")
+    if header.get('metadata_fields') != list(ingest.METADATA_FIELDS):
+        problems.append(f"metadata fields {header.get('metadata_fields')} (expected {list(ingest.METADATA_FIELDS)})")
+    if header.get('collection') != COLLECTION_NAME:
+        problems.append(f"collection {header.get('collection')!r} (configured {COLLECTION_NAME!r})")
+    if problems:
+        raise SnapshotError("incompatible snapshot: " + "; ".join(problems))
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """Verifies and reads a snapshot. Returns (header, embeddings, records)."""
+    verify_checksum(path)
+    header = read_header(path)
+    check_compatible(header)
+    with open(path, 'rb') as f:
+        f.seek(len(MAGIC))
+        (length,) = LENGTH.unpack(f.read(LENGTH.size))
+        f.seek(length, os.SEEK_CUR)
+        payload = f.read(os.path.getsize(path) - f.tell() - DIGEST_SIZE)
+    count, dimension = header['count'], header['dimension'] or 0
+    try:
+        data = zlib.decompress(payload)
+    except zlib.error as e:
+        raise SnapshotError(f"{path} has a corrupt payload: {e}") from None
+    split = count * dimension * 4
+    if split > len(data):
+        raise SnapshotError(f"{path} holds {len(data)} payload bytes, fewer than {count} x {dimension} vectors")
+    embeddings = np.frombuffer(data, dtype='<f4', count=count * dimension).reshape(count, dimension)
+    try:
+        records = json.loads(data[split:].decode('utf-8'))
+    except ValueError as e:
+        raise SnapshotError(f"{path} has unreadable records: {e}") from None
+    if len(records) != count:
+        raise SnapshotError(f"{path} has {len(records)} records for {count} vectors")
+    return header, embeddings, records
+
+
+def import_snapshot(client, path=SNAPSHOT_PATH, on_progress=None):
+    """
+    Replaces the collection with the snapshot's vectors using bulk inserts
+    (no embedding) and writes the matching manifest. Returns the collection.
+    """
+    import query_engine
+
+    header, embeddings, records = load_snapshot(path)
+    try:
+        client.delete_collection(COLLECTION_NAME)
+    except Exception:
+        pass  # Nothing to replace
+    collection = query_engine.get_collection(client, COLLECTION_NAME)
+    batch_size = getattr(client, 'get_max_batch_size', lambda: 5000)()
+    for start in range(0, len(records), batch_size):
+        chunk = records[start:start + batch_size]
+        collection.add(
+            ids=[r[0] for r in chunk],
+            embeddings=embeddings[start:start + len(chunk)],
+            metadatas=[r[1] for r in chunk],
+        )
+        if on_progress:
+            on_progress(start + len(chunk))
+    ingest.save_manifest({
+        'collection': COLLECTION_NAME,
+        'model': header['model'],
+        'index_langs': header['index_langs'],
+        'metadata_fields': header['metadata_fields'],
+        'hnsw': query_engine.COLLECTION_METADATA,  # Rebuilt with the configured settings
+        'version': header['version'],
+        'hashes': header['hashes'],
+    })
+    return collection
+
+
+def restore_if_needed(client, path=SNAPSHOT_PATH, on_progress=None):
+    """
+    Bulk-loads the snapshot when the on-disk index is missing or unusable,
+    so the following sync_index() has nothing (or little) to embed.
+    Returns True if the snapshot was imported.
+    """
+    import query_engine
+
+    if not path or not os.path.exists(path):
+        return False
+    manifest = ingest.load_manifest()
+    if ingest.manifest_compatible(manifest):
+        collection = query_engine.get_collection(client, COLLECTION_NAME)
+        if collection.count() and collection.count() == len(manifest['hashes']) * len(INDEX_LANGS):
+            return False  # The existing index is usable; sync_index handles any drift
+    try:
+        import_snapshot(client, path, on_progress=on_progress)
+    except SnapshotError as e:
+        print(f"Ignoring index snapshot {path}: {e}")
+        return False
+    return True
+
+
+def main():
+    import chromadb
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    path = sys.argv[2] if len(sys.argv) > 2 else SNAPSHOT_PATH
+    if command not in ("export", "import", "verify"):
+        sys.exit(__doc__)
+
+    if command == "verify":
+        verify_checksum(path)
+        header = read_header(path)
+        check_compatible(header)
+        print(f"OK: {header['count']} vectors, model {header['model']} ({header['dimension']} dims), "
+              f"version {header['version']}")
+        return
+
+    client = chromadb.PersistentClient(path=DB_PATH)
+    if command == "export":
+        collection, stats = ingest.sync_index(client, ingest.expand_paths(CORPUS_FILES))
+        header = export_snapshot(collection, ingest.load_manifest(), path)
+        print(f"Wrote {path}: {header['count']} vectors, version {header['version']}, "
+              f"{os.path.getsize(path) / 1e6:.2f} MB")
+    else:
+        start = time.perf_counter()
+        collection = import_snapshot(client, path)
+        print(f"Imported {collection.count()} vectors from {path} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Background warm-up and startup profile for the app.
+
+Importing chromadb and the embedding runtime (torch or onnxruntime), loading
+the model and opening the index take several seconds. Warmup runs all of
+that on a daemon thread so the first page renders immediately, and exposes
+a readiness gate the app polls. StartupProfile records how long each phase
+took, plus the time to the first answered query.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Process-wide reference point: this module is imported once, at first page load
+PROCESS_START = time.perf_counter()
+
+
+class StartupProfile:
+    """Named phase durations and milestones since process start, in seconds."""
+
+    def __init__(self, origin=PROCESS_START):
+        self.origin = origin
+        self.phases = {}
+        self.milestones = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = time.perf_counter() - start
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases.setdefault(name, seconds)
+
+    def mark(self, name):
+        """Records the first time a milestone is reached (later calls are ignored)."""
+        with self._lock:
+            self.milestones.setdefault(name, time.perf_counter() - self.origin)
+
+    def report(self):
+        with self._lock:
+            return {
+                "phases_s": {name: round(s, 3) for name, s in self.phases.items()},
+                "milestones_s": {name: round(s, 3) for name, s in self.milestones.items()},
+            }
+
+
+profile = StartupProfile()
+
+
+class Warmup:
+    """
+    Loads the model and opens the retrieval stack on a background thread,
+    or connects to a shared embedding server when given its socket.
+    """
+
+    def __init__(self, backend_kind, profile=profile, server_socket=None):
+        self.backend_kind = backend_kind
+        self.server_socket = server_socket
+        self.profile = profile
+        self.message = "Starting up…"
+        self.error = None
+        self.client = None
+        self.collection = None
+        self.backend = None
+        self.version = None
+        self.sync_stats = None
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    @property
+    def is_done(self):
+        return self._done.is_set()
+
+    @property
+    def is_ready(self):
+        return self._done.is_set() and self.error is None
+
+    def wait(self, timeout=None):
+        """Blocks until warm-up finishes. Returns True when ready."""
+        self._done.wait(timeout)
+        return self.is_ready
+
+    def _run(self):
+        import query_engine
+        from config import TOP_K, SAMPLE_QUESTIONS, SAMPLE_QUERIES_PATH
+
+        try:
+            if self.server_socket:
+                self._connect_server()
+            else:
+                self._load_local()
+
+            self.message = "Warming up result cache…"
+            with self.profile.phase("cache_prewarm"):
+                queries = [(q, lang) for lang, questions in SAMPLE_QUESTIONS.items() for q in questions]
+                queries += query_engine.load_sample_queries(SAMPLE_QUERIES_PATH)
+                try:
+                    added = query_engine.prewarm(self.backend, queries, self.version, k=TOP_K)
+                    print(f"Prewarmed result cache with {added} queries")
+                except Exception as e:
+                    print(f"Result cache prewarm failed: {e}")
+
+            self.profile.mark("ready")
+            self.message = "Ready"
+            print(f"Startup profile: {self.profile.report()}")
+        except Exception as e:
+            self.error = e
+            self.message = f"Startup failed: {e}"
+            print(f"Warm-up failed: {e}")
+        finally:
+            self._done.set()
+
+    def _connect_server(self):
+        """Uses the shared embedding server instead of loading the model and index here."""
+        import embedding_server
+
+        self.message = "Connecting to embedding server…"
+        with self.profile.phase("server_connect"):
+            client = embedding_server.EmbeddingClient(self.server_socket)
+            self.version = client.ping()
+            self.backend = embedding_server.RemoteBackend(client, self.version)
+
+    def _load_local(self):
+        """Loads the model, syncs the index and opens the retrieval backend in-process."""
+        import embedding_backends
+        import ingest
+        import query_engine
+        import reranker
+        import retrieval_backends
+        import snapshot
+        from config import CORPUS_FILES, DB_PATH, EMBEDDING_BACKEND, RERANK
+
+        paths = ingest.expand_paths(CORPUS_FILES)
+        missing = [p for p in paths if not os.path.exists(p)]
+        if missing:
+            raise FileNotFoundError(f"File not found: {', '.join(missing)}")
+
+        self.message = "Loading vector database…"
+        with self.profile.phase("import_chromadb"):
+            import chromadb
+
+        self.message = "Loading embedding model…"
+        with self.profile.phase(f"import_{EMBEDDING_BACKEND}_runtime"):
+            embedding_backends.import_runtime(EMBEDDING_BACKEND)
+        with self.profile.phase("model_load"):
+            query_engine.get_model()
+        if RERANK:
+            with self.profile.phase("rerank_model_load"):
+                # Loaded and timed up front so the first query has a cost estimate for its budget
+                reranker.get_reranker().warm_up()
+
+        self.message = "Opening index…"
+        with self.profile.phase("index_open"):
+            self.client = chromadb.PersistentClient(path=DB_PATH)
+        with self.profile.phase("snapshot_restore"):
+            # A prebuilt snapshot replaces embedding the whole corpus on a fresh deployment
+            snapshot.restore_if_needed(
+                self.client,
+                on_progress=lambda n: setattr(self, "message", f"Loading index snapshot… {n} vectors"),
+            )
+        with self.profile.phase("index_sync"):
+            # Only verses that changed since the last run (per the manifest) are re-embedded
+            self.collection, self.sync_stats = ingest.sync_index(
+                self.client,
+                paths,
+                on_progress=lambda n: setattr(self, "message", f"Indexing verses… {n} done"),
+            )
+        stats = self.sync_stats
+        if stats['upserted'] or stats['deleted'] or stats['orphans_removed']:
+            print(f"Index sync at {DB_PATH}: {stats['upserted']} upserted, {stats['deleted']} deleted, "
+                  f"orphaned collections removed: {stats['orphans_removed']}")
+        self.version = f"{self.collection.name}:{stats['version']}"
+
+        with self.profile.phase("backend_open"):
+            self.backend = retrieval_backends.create_backend(self.backend_kind, self.collection, self.version)
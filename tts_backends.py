@@ -0,0 +1,130 @@
+"""
+Pluggable text-to-speech backends that synthesize into memory.
+
+Every backend exposes synthesize(text, lang) -> bytes (no temporary files):
+
+- "gtts":   Google Translate TTS over the network (MP3); rate limited
+- "espeak": espeak-ng running locally, one subprocess per clip, so many
+            clips synthesize in parallel across processes without any
+            network access. WAV output is re-encoded to MP3 through ffmpeg
+            so clips stay interchangeable with the gTTS ones.
+
+CachedTTS wraps a backend with a cache keyed by (text hash, lang, backend
+settings): a byte-bounded in-memory LRU in front of an optional on-disk
+directory.
+"""
+
+import hashlib
+import io
+import subprocess
+from pathlib import Path
+
+from audio_store import AudioStore
+from config import TTS_BACKEND, TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_ESPEAK_VOICES
+
+
+class TTSBackend:
+    """Interface shared by all TTS backends."""
+
+    name = "base"
+    mime = "audio/mp3"
+    extension = "mp3"
+    rate_limited = False  # True for remote services that need the pipeline's token bucket
+
+    def synthesize(self, text, lang):
+        """Returns the encoded clip for `text` in language code `lang`."""
+        raise NotImplementedError
+
+    def settings(self, lang):
+        """Identifies everything besides the text that shapes the clip for `lang`."""
+        return self.name
+
+
+class GTTSBackend(TTSBackend):
+    name = "gtts"
+    rate_limited = True
+
+    def synthesize(self, text, lang):
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class EspeakBackend(TTSBackend):
+    """Offline synthesis with espeak-ng (and ffmpeg for MP3 output)."""
+
+    name = "espeak"
+
+    def __init__(self, executable="espeak-ng", voices=TTS_ESPEAK_VOICES, bitrate="48k"):
+        self.executable = executable
+        self.voices = voices
+        self.bitrate = bitrate
+
+    def settings(self, lang):
+        return f"{self.name}-{self.voices.get(lang, lang)}-{self.bitrate}".replace("/", "_")
+
+    def synthesize(self, text, lang):
+        voice = self.voices.get(lang, lang)
+        # Text goes through stdin so long verses never hit argument limits
+        wav = subprocess.run(
+            [self.executable, "-v", voice, "--stdout"],
+            input=text.encode('utf-8'),
+            capture_output=True,
+            check=True,
+        ).stdout
+        from audio_pack import transcode
+        return transcode(wav, "mp3", self.bitrate)
+
+
+BACKENDS = {"gtts": GTTSBackend, "espeak": EspeakBackend}
+
+
+class CachedTTS:
+    """A backend behind an in-memory LRU and an optional on-disk cache."""
+
+    def __init__(self, backend, max_bytes=TTS_CACHE_MAX_BYTES, cache_dir=TTS_CACHE_DIR):
+        self.backend = backend
+        self.store = AudioStore(max_bytes)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    @property
+    def mime(self):
+        return self.backend.mime
+
+    @property
+    def rate_limited(self):
+        return self.backend.rate_limited
+
+    def _disk_path(self, digest, lang):
+        settings = self.backend.settings(lang)
+        return self.cache_dir / settings / digest[:2] / f"{digest}_{lang}.{self.backend.extension}"
+
+    def synthesize(self, text, lang):
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        key = (digest, lang, self.backend.settings(lang))
+        return self.store.get(key, lambda: self._load(digest, text, lang))
+
+    def _load(self, digest, text, lang):
+        path = self._disk_path(digest, lang) if self.cache_dir else None
+        if path is not None and path.exists():
+            return path.read_bytes()
+        data = self.backend.synthesize(text, lang)
+        if path is not None:
+            from audio_pipeline import write_atomic
+            write_atomic(path, data)
+        return data
+
+
+def get_tts(name=TTS_BACKEND, cached=True):
+    """Builds the named backend, wrapped in the cache by default."""
+    try:
+        backend = BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend: {name!r} (expected one of {', '.join(BACKENDS)})") from None
+    return CachedTTS(backend) if cached else backend
@@ -0,0 +1,198 @@
+"""
+HNSW tuning sweep for the Chroma collection.
+
+Embeds a corpus (the configured chapters or --corpus files, optionally
+grown synthetically) and a query set (--queries, or the benchmark queries
+plus samples of verse translations) once, computes exact brute-force top-k ground truth over the same
+language-routed vectors the app searches, then builds one scratch
+collection per (space, M, construction_ef, search_ef) combination from the
+precomputed embeddings and measures:
+
+  - recall@k against the exact results
+  - p50/p99 query latency
+  - build time and on-disk index size
+
+and recommends the fastest setting that meets the recall target, as the
+HNSW_* values to put in config.py.
+
+Usage:
+    python tune_hnsw.py
+    python tune_hnsw.py --size 5000 --m 8 16 32 --search-ef 10 20 50 100 --target 0.99
+    python tune_hnsw.py --corpus "data/*.json" --queries queries.txt
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import ingest
+import query_engine
+from benchmark import benchmark_queries, summarize, synthetic_verses
+from config import INDEX_LANGS, TOP_K
+from retrieval_backends import ChromaBackend
+from verse_store import VerseStore, expand_paths, get_store
+
+_ADD_BATCH = 1024
+
+
+def directory_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def exact_top_k(doc_vectors, doc_langs, query_vectors, routes, k):
+    """Brute-force top-k row indices per query, restricted to its routed languages."""
+    truth = []
+    for vector, langs in zip(query_vectors, routes):
+        rows = np.flatnonzero(np.isin(doc_langs, langs))
+        scores = doc_vectors[rows] @ vector
+        top = rows[np.argsort(-scores)[:k]]
+        truth.append(top)
+    return truth
+
+
+def build_collection(path, ids, vectors, metadatas, metadata):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=str(path))
+    collection = query_engine.get_collection(client, "tune", metadata=metadata)
+    for start in range(0, len(ids), _ADD_BATCH):
+        collection.add(
+            ids=ids[start:start + _ADD_BATCH],
+            embeddings=vectors[start:start + _ADD_BATCH],
+            metadatas=metadatas[start:start + _ADD_BATCH],
+        )
+    return collection
+
+
+def evaluate(collection, query_vectors, routes, truth, ids, k, repeats):
+    backend = ChromaBackend(collection)
+    row_of = {vector_id: row for row, vector_id in enumerate(ids)}
+    hits, samples = 0, []
+    for _ in range(repeats):
+        for vector, langs, expected in zip(query_vectors, routes, truth):
+            start = time.perf_counter()
+            found_ids, _, _ = backend.search(vector[None, :], k, langs=langs)
+            samples.append(time.perf_counter() - start)
+            hits += len({row_of[i] for i in found_ids[0]} & set(expected.tolist()))
+    recall = hits / (repeats * sum(len(t) for t in truth))
+    return recall, summarize(samples)
+
+
+def load_queries(path):
+    """One query per non-empty line."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def recommend(results, target):
+    """Fastest (p50, then p99, then size) configuration meeting the recall target."""
+    passing = [r for r in results if r["recall"] >= target]
+    if not passing:
+        return None
+    return min(passing, key=lambda r: (r["latency"]["p50_ms"], r["latency"]["p99_ms"], r["index_bytes"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep HNSW parameters: recall@k vs latency and index size.")
+    parser.add_argument("--corpus", nargs="+", help="Chapter JSON files or glob patterns (default: CORPUS_FILES)")
+    parser.add_argument("--queries", help="Text file with one query per line (default: benchmark queries)")
+    parser.add_argument("--size", type=int, default=None, help="Corpus size in verses (default: the real corpus)")
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--doc-queries", type=int, default=100,
+                        help="Extra queries sampled from verse translations (without --queries)")
+    parser.add_argument("--space", nargs="+", default=["cosine"])
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 20, 50, 100])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--target", type=float, default=0.99, help="Minimum recall@k")
+    parser.add_argument("--output", help="Write all results as JSON")
+    args = parser.parse_args()
+
+    verses = list(VerseStore.load(expand_paths(args.corpus)) if args.corpus else get_store())
+    if args.size:
+        verses = list(synthetic_verses(verses, args.size))
+
+    pairs = [(v, lang) for v in verses for lang in INDEX_LANGS]
+    ids = [ingest.vector_id(ingest.verse_id(v), lang) for v, lang in pairs]
+    metadatas = [{"verse_id": ingest.verse_id(v), "lang": lang} for v, lang in pairs]
+    doc_langs = np.array([lang for _, lang in pairs])
+    print(f"Embedding {len(ids)} vectors ({len(verses)} verses x {len(INDEX_LANGS)} languages)...")
+    doc_vectors = query_engine.embed([ingest.build_document(v, lang) for v, lang in pairs], batch_size=64)
+
+    if args.queries:
+        queries = load_queries(args.queries)
+    else:
+        rng = random.Random(0)
+        queries = benchmark_queries()
+        sampled = rng.sample(verses, min(args.doc_queries, len(verses)))
+        queries += [v["english_translation"][:200] for v in sampled]
+    query_vectors = query_engine.embed(queries)
+    routes = [query_engine.route_languages(q) for q in queries]
+    truth = exact_top_k(doc_vectors, doc_langs, query_vectors, routes, args.k)
+    print(f"{len(queries)} queries, exact top-{args.k} ground truth computed\n")
+
+    results = []
+    header = f"{'space':<7} {'M':>3} {'c_ef':>5} {'s_ef':>5} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'size MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for space in args.space:
+        for m in args.m:
+            for construction_ef in args.construction_ef:
+                for search_ef in args.search_ef:
+                    workdir = Path(tempfile.mkdtemp(prefix="gita_hnsw_"))
+                    try:
+                        metadata = query_engine.hnsw_metadata(space, construction_ef, search_ef, m)
+                        start = time.perf_counter()
+                        collection = build_collection(workdir, ids, doc_vectors, metadatas, metadata)
+                        build_s = time.perf_counter() - start
+                        recall, latency = evaluate(
+                            collection, query_vectors, routes, truth, ids, args.k, args.repeats
+                        )
+                        size = directory_size(workdir)
+                    finally:
+                        shutil.rmtree(workdir, ignore_errors=True)
+                    results.append({
+                        "space": space, "m": m, "construction_ef": construction_ef, "search_ef": search_ef,
+                        "recall": recall, "latency": latency, "build_s": build_s, "index_bytes": size,
+                    })
+                    print(f"{space:<7} {m:>3} {construction_ef:>5} {search_ef:>5} {recall:>7.4f} "
+                          f"{latency['p50_ms']:>8.3f} {latency['p99_ms']:>8.3f} {build_s:>8.2f} "
+                          f"{size / 1e6:>8.2f}")
+
+    best = recommend(results, args.target)
+    print()
+    if best is None:
+        print(f"No configuration reached recall@{args.k} >= {args.target}; widen --search-ef / --m.")
+    else:
+        print(f"Recommended (fastest with recall@{args.k} >= {args.target}): recall {best['recall']:.4f}, "
+              f"p50 {best['latency']['p50_ms']:.3f} ms, p99 {best['latency']['p99_ms']:.3f} ms")
+        print(f'HNSW_SPACE = "{best["space"]}"')
+        print(f"HNSW_CONSTRUCTION_EF = {best['construction_ef']}")
+        print(f"HNSW_SEARCH_EF = {best['search_ef']}")
+        print(f"HNSW_M = {best['m']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "corpus_verses": len(verses),
+                "vectors": len(ids),
+                "queries": len(queries),
+                "k": args.k,
+                "target": args.target,
+                "cpu_count": os.cpu_count(),
+                "results": results,
+                "recommended": best,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Script to verify that the NumPy exact-search backend agrees with Chroma.
+Runs the sample questions and SAMPLE_QUERIES.md through both backends and
+compares the top-k verse ids and relevance scores. Exits non-zero on mismatch.
+"""
+
+import sys
+
+import chromadb
+import numpy as np
+
+import ingest
+import query_engine
+import retrieval_backends
+from config import (
+    DB_PATH, COLLECTION_NAME, CORPUS_FILES, TOP_K,
+    SAMPLE_QUESTIONS, SAMPLE_QUERIES_PATH,
+)
+
+SCORE_TOLERANCE = 1e-3
+
+print("=" * 60)
+print("Retrieval Backend Parity Check")
+print("=" * 60)
+
+client = chromadb.PersistentClient(path=DB_PATH)
+collection, stats = ingest.sync_index(client, ingest.expand_paths(CORPUS_FILES))
+chroma = retrieval_backends.create_backend("chroma", collection, stats['version'])
+numpy_backend = retrieval_backends.create_backend("numpy", collection, stats['version'])
+
+queries = [q for questions in SAMPLE_QUESTIONS.values() for q in questions]
+queries += [q for q, _ in query_engine.load_sample_queries(SAMPLE_QUERIES_PATH)]
+queries = list(dict.fromkeys(queries))
+
+print(f"\nCollection: {COLLECTION_NAME} ({collection.count()} verses)")
+print(f"Queries: {len(queries)}, k = {TOP_K}\n")
+
+chroma_results = query_engine.search_batch(chroma, queries, k=TOP_K)
+numpy_results = query_engine.search_batch(numpy_backend, queries, k=TOP_K)
+
+failures = 0
+for query, a, b in zip(queries, chroma_results, numpy_results):
+    if a.ids == b.ids:
+        max_diff = float(np.max(np.abs(a.scores - b.scores), initial=0.0))
+    elif set(a.ids) == set(b.ids):
+        # HNSW is approximate: tolerate reordering of near-ties, not different verses
+        max_diff = float(np.max(np.abs(np.sort(a.scores) - np.sort(b.scores))))
+    else:
+        max_diff = float('inf')
+    ok = max_diff <= SCORE_TOLERANCE
+    failures += not ok
+    mark = "✅" if ok else "❌"
+    print(f"{mark} {query[:40]:<40} chroma={a.ids} numpy={b.ids} max|Δscore|={max_diff:.2e}")
+
+print("\n" + "=" * 60)
+print("PARITY CONFIRMED" if failures == 0 else f"PARITY FAILED for {failures} query(ies)")
+print("=" * 60)
+sys.exit(1 if failures else 0)
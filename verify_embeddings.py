@@ -0,0 +1,73 @@
+"""
+Script to verify that the ONNX embedding backends agree with PyTorch.
+Embeds every per-language verse document and the sample queries with the torch
+reference and with each ONNX variant, then reports per-vector cosine
+agreement and top-k retrieval overlap (exact search over the verses).
+Exits non-zero if a variant falls below the thresholds.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import embedding_backends
+import ingest
+import query_engine
+import verse_store
+from config import INDEX_LANGS, TOP_K, SAMPLE_QUESTIONS, SAMPLE_QUERIES_PATH
+
+MIN_COSINE = {"onnx": 0.999, "onnx-int8": 0.98}
+MIN_TOPK_OVERLAP = {"onnx": 1.0, "onnx-int8": 0.9}
+
+
+def top_k(doc_vectors, query_vectors, k):
+    scores = query_vectors @ doc_vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+print("=" * 60)
+print("Embedding Backend Parity Check")
+print("=" * 60)
+
+docs = [
+    ingest.build_document(v, lang)
+    for v in verse_store.get_store()
+    for lang in INDEX_LANGS
+]
+queries = [q for questions in SAMPLE_QUESTIONS.values() for q in questions]
+queries += [q for q, _ in query_engine.load_sample_queries(SAMPLE_QUERIES_PATH)]
+queries = list(dict.fromkeys(queries))
+print(f"\nDocuments: {len(docs)}, queries: {len(queries)}, k = {TOP_K}\n")
+
+reference = embedding_backends.create_embedder("torch")
+start = time.perf_counter()
+ref_docs = reference.encode(docs)
+ref_queries = reference.encode(queries)
+print(f"torch      encode {time.perf_counter() - start:.2f}s")
+ref_top = top_k(ref_docs, ref_queries, TOP_K)
+
+failures = 0
+for kind in ("onnx", "onnx-int8"):
+    embedder = embedding_backends.create_embedder(kind)
+    start = time.perf_counter()
+    docs_v = embedder.encode(docs)
+    queries_v = embedder.encode(queries)
+    elapsed = time.perf_counter() - start
+
+    cosines = np.concatenate([(docs_v * ref_docs).sum(axis=1), (queries_v * ref_queries).sum(axis=1)])
+    # Reference index, candidate query vectors: what a torch-built index sees at serving time
+    overlap = np.mean([
+        len(set(a) & set(b)) / TOP_K
+        for a, b in zip(ref_top, top_k(ref_docs, queries_v, TOP_K))
+    ])
+    ok = cosines.min() >= MIN_COSINE[kind] and overlap >= MIN_TOPK_OVERLAP[kind]
+    failures += not ok
+    mark = "✅" if ok else "❌"
+    print(f"{mark} {kind:<10} encode {elapsed:.2f}s  cosine mean={cosines.mean():.5f} "
+          f"min={cosines.min():.5f}  top-{TOP_K} overlap={overlap:.3f}")
+
+print("\n" + "=" * 60)
+print("PARITY CONFIRMED" if failures == 0 else f"PARITY FAILED for {failures} backend(s)")
+print("=" * 60)
+sys.exit(1 if failures else 0)
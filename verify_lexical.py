@@ -0,0 +1,56 @@
+"""
+Script to verify search with the lexical index enabled.
+Runs multi-word questions, short rare-word queries and a verse reference
+through search_batch on the NumPy backend with a lexical index attached, and
+checks every query returns results from the expected path. Exits non-zero
+on failure.
+"""
+
+import sys
+
+import chromadb
+
+import ingest
+import query_engine
+import retrieval_backends
+from config import CORPUS_FILES, DB_PATH, TOP_K, SAMPLE_QUESTIONS
+from lexical_index import LexicalIndex
+
+# (query, expected sources); None accepts any source
+CHECKS = [
+    ("What is the nature of the soul?", ("dense", "hybrid", "rerank")),
+    ("peace", None),
+    ("Kshatriya", None),
+    ("ಆತ್ಮದ ಸ್ವರೂಪವೇನು?", ("dense", "hybrid", "rerank")),
+    ("2.47", ("reference",)),
+]
+CHECKS += [(q, None) for questions in SAMPLE_QUESTIONS.values() for q in questions]
+
+print("=" * 60)
+print("Lexical Search Verification")
+print("=" * 60)
+
+client = chromadb.PersistentClient(path=DB_PATH)
+collection, stats = ingest.sync_index(client, ingest.expand_paths(CORPUS_FILES))
+backend = retrieval_backends.create_backend("numpy", collection, stats['version'])
+if backend.lexical is None:  # LEXICAL_SEARCH is off in config: attach one anyway
+    backend.lexical = LexicalIndex.build(backend.store)
+
+queries = [query for query, _ in CHECKS]
+failures = 0
+try:
+    results = query_engine.search_batch(backend, queries, k=TOP_K)
+except Exception as e:
+    print(f"❌ search_batch raised {type(e).__name__}: {e}")
+    sys.exit(1)
+
+for (query, sources), result in zip(CHECKS, results):
+    ok = bool(result.ids) and (sources is None or result.source in sources)
+    failures += not ok
+    mark = "✅" if ok else "❌"
+    print(f"{mark} {query[:40]:<40} source={result.source} ids={result.ids}")
+
+print("\n" + "=" * 60)
+print("LEXICAL SEARCH OK" if failures == 0 else f"LEXICAL SEARCH FAILED for {failures} query(ies)")
+print("=" * 60)
+sys.exit(1 if failures else 0)
@@ -1,59 +1,89 @@
 """
 Script to verify ChromaDB persistence and reproducibility.
-This shows that the database is fully persisted and can be copied/shared.
+This shows that the database is fully persisted and can be copied/shared,
+and that the index snapshot (if any) matches the configured model and collection.
 """
 
-import chromadb
-from chromadb.utils import embedding_functions
 import os
+import sys
+
+import chromadb
 
-# Path to the persisted database
-db_path = os.path.join(os.getcwd(), "chroma_db")
+import ingest
+import query_engine
+import snapshot
+from config import COLLECTION_NAME, DB_PATH, EMBEDDING_MODEL_NAME, INDEX_LANGS, SNAPSHOT_PATH
+from retrieval_backends import ChromaBackend
 
 print("=" * 60)
 print("ChromaDB Persistence Verification")
 print("=" * 60)
 
+failures = []
+
 # Connect to existing database
-client = chromadb.PersistentClient(path=db_path)
-sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(
-    model_name="all-MiniLM-L6-v2"
-)
-
-# Get the collection
-collection = client.get_collection(
-    name="gita_chapter_2_v3",
-    embedding_function=sentence_transformer_ef
-)
-
-print(f"\n✅ Database Location: {db_path}")
+client = chromadb.PersistentClient(path=DB_PATH)
+collection = query_engine.get_collection(client, COLLECTION_NAME)
+manifest = ingest.load_manifest()
+
+print(f"\n✅ Database Location: {DB_PATH}")
 print(f"✅ Collection Name: {collection.name}")
-print(f"✅ Total Documents: {collection.count()}")
+print(f"✅ Total Vectors: {collection.count()}")
+
+if not ingest.manifest_compatible(manifest):
+    failures.append(f"manifest does not match model {EMBEDDING_MODEL_NAME!r} / collection {COLLECTION_NAME!r}")
+elif collection.count() != len(manifest['hashes']) * len(INDEX_LANGS):
+    failures.append(f"collection holds {collection.count()} vectors, manifest expects "
+                    f"{len(manifest['hashes']) * len(INDEX_LANGS)}")
+else:
+    print(f"✅ Manifest: {len(manifest['hashes'])} verses, model {manifest['model']}, version {manifest['version']}")
 
 # Get database size
 total_size = 0
-for root, dirs, files in os.walk(db_path):
+for root, dirs, files in os.walk(DB_PATH):
     for file in files:
         total_size += os.path.getsize(os.path.join(root, file))
 
 print(f"✅ Database Size: {total_size / 1024:.2f} KB")
 
+# The snapshot must be intact and built for the configured model and collection
+if os.path.exists(SNAPSHOT_PATH):
+    try:
+        snapshot.verify_checksum(SNAPSHOT_PATH)
+        header = snapshot.read_header(SNAPSHOT_PATH)
+        snapshot.check_compatible(header)
+        print(f"✅ Snapshot: {SNAPSHOT_PATH} ({header['count']} vectors, {header['dimension']} dims, "
+              f"version {header['version']})")
+        if manifest is not None and header['version'] != manifest.get('version'):
+            print(f"   Note: snapshot version differs from the index ({manifest.get('version')}); "
+                  f"re-run `python snapshot.py export` to refresh it")
+    except snapshot.SnapshotError as e:
+        failures.append(str(e))
+else:
+    print(f"ℹ️  No snapshot at {SNAPSHOT_PATH}")
+
 # Test a query to verify it works
-results = collection.query(
-    query_texts=["What is the soul?"],
-    n_results=1
-)
+if collection.count():
+    result = query_engine.search(ChromaBackend(collection), "What is the soul?", k=1)
+    print(f"\n✅ Test Query Successful!")
+    print(f"   Top Result: Verse {result.metadatas[0]['verse']} (relevance {result.top_score:.3f})")
+else:
+    failures.append("collection is empty")
 
-print(f"\n✅ Test Query Successful!")
-print(f"   Top Result: Verse {results['metadatas'][0][0]['verse']}")
+if failures:
+    print("\n" + "=" * 60)
+    print("VERIFICATION FAILED")
+    print("=" * 60)
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1)
 
 print("\n" + "=" * 60)
 print("REPRODUCIBILITY CONFIRMED")
 print("=" * 60)
 print("\nYou can:")
-print("1. Copy the 'chroma_db' folder to another machine")
-print("2. Run the app there with the same results")
-print("3. Share the database with others")
-print("4. Version control it (though it's binary)")
-print("\nThe database uses DuckDB internally for metadata storage!")
+print("1. Copy the 'chroma_db' folder (with its manifest) to another machine")
+print("2. Or ship the snapshot: `python snapshot.py export`, then the app loads it on first start")
+print("3. Run the app there with the same results")
+print("4. Share the database with others")
 print("=" * 60)
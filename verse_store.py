@@ -0,0 +1,147 @@
+"""
+Shared in-memory verse store.
+
+Every part of the app reads verses through one store instead of parsing the
+chapter files itself. Verses are compact __slots__ records indexed by
+(chapter, verse) and by verse id, so lookups are O(1) and each verse's text
+is held once per process however many results, sessions or indexes refer to it.
+
+The vector index only keeps ids and the few fields needed for filtering;
+search results are hydrated from the store (see query_engine).
+
+Usage:
+    store = get_store()                 # CORPUS_FILES, reloaded when they change
+    store.get(2, 47)["english_translation"]
+    for verse in store: ...
+"""
+
+import glob
+import json
+import os
+import threading
+
+from config import CORPUS_FILES
+
+
+def expand_paths(patterns):
+    """Expands glob patterns into a sorted, de-duplicated list of file paths."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def verse_id(verse):
+    return f"ch{verse['chapter']}_v{verse['verse']}"
+
+
+class Verse:
+    """One verse. Supports verse["field"] and verse.get("field") like the dicts it replaces."""
+
+    FIELDS = ("chapter", "verse", "text", "translation", "english_translation")
+    __slots__ = FIELDS + ("verse_id",)
+
+    def __init__(self, chapter, verse, text, translation, english_translation):
+        self.chapter = chapter
+        self.verse = verse
+        self.text = text  # Sanskrit in Kannada script
+        self.translation = translation  # Kannada
+        self.english_translation = english_translation
+        self.verse_id = verse_id(self)
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"Verse({self.chapter}.{self.verse})"
+
+
+def iter_verses(paths):
+    """
+    Yields one Verse at a time from every chapter in every file. Only one
+    file is parsed at a time.
+    """
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for chapter in data['chapters']:
+            chapter_number = chapter.get('chapter_number')
+            for verse in chapter['verses']:
+                yield Verse(
+                    chapter_number,
+                    verse['verse'],
+                    verse['text'],
+                    verse['translation'],
+                    verse['english_translation'],
+                )
+        del data
+
+
+class VerseStore:
+    """Verses in corpus order with O(1) lookup by (chapter, verse) and by verse id."""
+
+    def __init__(self, verses=()):
+        self._verses = []
+        self._by_key = {}
+        self._by_id = {}
+        for verse in verses:
+            key = (verse['chapter'], verse['verse'])
+            if key in self._by_key:
+                continue  # First occurrence wins, as in the index
+            if not isinstance(verse, Verse):
+                verse = Verse(*(verse[field] for field in Verse.FIELDS))
+            self._verses.append(verse)
+            self._by_key[key] = verse
+            self._by_id[verse.verse_id] = verse
+
+    @classmethod
+    def load(cls, paths):
+        return cls(iter_verses(paths))
+
+    def __len__(self):
+        return len(self._verses)
+
+    def __iter__(self):
+        return iter(self._verses)
+
+    def get(self, chapter, verse):
+        return self._by_key.get((chapter, verse))
+
+    def by_id(self, vid):
+        return self._by_id.get(vid)
+
+    def chapters_of(self, verse):
+        """Chapters that have a verse with this number, in ascending order."""
+        return sorted(c for c, v in self._by_key if v == verse)
+
+
+_store = None
+_store_signature = None
+_store_lock = threading.Lock()
+
+
+def _signature(paths):
+    return tuple((path, os.path.getmtime(path)) for path in paths if os.path.exists(path))
+
+
+def get_store(patterns=CORPUS_FILES):
+    """Returns the process-wide store of the corpus, reloading it when a chapter file changes."""
+    global _store, _store_signature
+    paths = expand_paths(patterns)
+    signature = _signature(paths)
+    if _store is None or signature != _store_signature:
+        with _store_lock:
+            if _store is None or signature != _store_signature:
+                _store, _store_signature = VerseStore.load(paths), signature
+    return _store